@@ -0,0 +1,104 @@
+"""Move default partition rows into new timesegment partitions
+
+A segment dated outside the created months lands in `timesegment_default`,
+and creating its month's partition later fails while the default partition
+holds rows of that month. `create_timesegment_partitions` now detaches the
+default partition for such a month, creates the partition, moves the rows
+over and attaches the default partition again.
+
+Revision ID: 5f8a13fc4401
+Revises: f158f5ef5daf
+Create Date: 2026-10-18 04:20:23.342290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f8a13fc4401'
+down_revision: Union[str, Sequence[str], None] = 'f158f5ef5daf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_timesegment_partitions(from_date date, to_date date)
+RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    month date := date_trunc('month', from_date)::date;
+    next_month date;
+    partition text;
+    created integer := 0;
+BEGIN
+    WHILE month <= to_date LOOP
+        next_month := (month + interval '1 month')::date;
+        partition := format('timesegment_p%s', to_char(month, 'YYYY_MM'));
+        IF to_regclass(partition) IS NULL THEN
+            IF EXISTS (
+                SELECT 1 FROM timesegment_default
+                WHERE start_time >= month AND start_time < next_month
+            ) THEN
+                -- the default partition may not hold rows of a new partition
+                ALTER TABLE timesegment DETACH PARTITION timesegment_default;
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF timesegment FOR VALUES FROM (%L) TO (%L)',
+                    partition, month, next_month
+                );
+                INSERT INTO timesegment
+                SELECT * FROM timesegment_default
+                WHERE start_time >= month AND start_time < next_month;
+                DELETE FROM timesegment_default
+                WHERE start_time >= month AND start_time < next_month;
+                ALTER TABLE timesegment ATTACH PARTITION timesegment_default DEFAULT;
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF timesegment FOR VALUES FROM (%L) TO (%L)',
+                    partition, month, next_month
+                );
+            END IF;
+            created := created + 1;
+        END IF;
+        month := next_month;
+    END LOOP;
+    RETURN created;
+END;
+$$
+"""
+
+# as created by a51e6ac036c2
+PREVIOUS_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_timesegment_partitions(from_date date, to_date date)
+RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    month date := date_trunc('month', from_date)::date;
+    partition text;
+    created integer := 0;
+BEGIN
+    WHILE month <= to_date LOOP
+        partition := format('timesegment_p%s', to_char(month, 'YYYY_MM'));
+        IF to_regclass(partition) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF timesegment FOR VALUES FROM (%L) TO (%L)',
+                partition, month, (month + interval '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        month := (month + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(CREATE_PARTITIONS_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(PREVIOUS_PARTITIONS_FUNCTION)
@@ -0,0 +1,68 @@
+"""Stamp change feed timestamps in the database
+
+`worklog.updated_at`, `timesegment.updated_at` and `tombstone.deleted_at`
+are set by triggers from the database clock, after the writing transaction
+has been given its id. Such a row is then never stamped earlier than the
+start of a transaction that `pg_stat_activity` already lists as writing,
+which is what lets the change feed hold back exactly the changes that could
+still commit behind a consumer's cursor.
+
+Revision ID: 892168f1eec5
+Revises: fb4264f6aa10
+Create Date: 2026-10-18 04:32:51.178206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '892168f1eec5'
+down_revision: Union[str, Sequence[str], None] = 'fb4264f6aa10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+STAMP_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION stamp_updated_at() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    -- assigns the transaction id first, see the change feed
+    PERFORM pg_current_xact_id();
+    NEW.updated_at := clock_timestamp() AT TIME ZONE 'UTC';
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION stamp_deleted_at() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_current_xact_id();
+    NEW.deleted_at := clock_timestamp() AT TIME ZONE 'UTC';
+    RETURN NEW;
+END;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(STAMP_FUNCTIONS)
+    for table in ("worklog", "timesegment"):
+        op.execute(
+            f"CREATE TRIGGER {table}_stamp_updated_at BEFORE INSERT OR UPDATE ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION stamp_updated_at()"
+        )
+    op.execute(
+        "CREATE TRIGGER tombstone_stamp_deleted_at BEFORE INSERT ON tombstone "
+        "FOR EACH ROW EXECUTE FUNCTION stamp_deleted_at()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER tombstone_stamp_deleted_at ON tombstone")
+    for table in ("worklog", "timesegment"):
+        op.execute(f"DROP TRIGGER {table}_stamp_updated_at ON {table}")
+    op.execute("DROP FUNCTION stamp_deleted_at()")
+    op.execute("DROP FUNCTION stamp_updated_at()")
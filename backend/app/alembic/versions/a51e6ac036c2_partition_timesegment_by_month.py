@@ -0,0 +1,141 @@
+"""Partition timesegment by month
+
+Rebuilds `timesegment` as a table range partitioned on `start_time`, one
+partition per month from the oldest segment up to a year ahead, plus a
+default partition for anything outside them. The primary key becomes
+(id, start_time) because it has to contain the partition key.
+
+Months are added by `create_timesegment_partitions(from, to)`, which the
+app calls on start; an old month can be dropped out of the table with
+`ALTER TABLE timesegment DETACH PARTITION timesegment_pYYYY_MM`.
+
+Revision ID: a51e6ac036c2
+Revises: 848bf7bd9dcb
+Create Date: 2026-10-18 04:01:34.087363
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a51e6ac036c2'
+down_revision: Union[str, Sequence[str], None] = '848bf7bd9dcb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = (
+    "id, worklog_id, user_id, start_time, end_time, description, notes, "
+    "recorded_at, created_at, updated_at, remittance_id"
+)
+
+INDEXES = (
+    ("ix_timesegment_worklog_id", ["worklog_id"], {}),
+    ("ix_timesegment_user_id", ["user_id"], {}),
+    ("ix_timesegment_updated_at", ["updated_at"], {}),
+    ("ix_timesegment_user_id_start_time", ["user_id", "start_time", "id"], {}),
+    (
+        "ix_timesegment_unremitted_worklog_id",
+        ["worklog_id"],
+        {"postgresql_where": sa.text("remittance_id IS NULL")},
+    ),
+)
+
+CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_timesegment_partitions(from_date date, to_date date)
+RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    month date := date_trunc('month', from_date)::date;
+    partition text;
+    created integer := 0;
+BEGIN
+    WHILE month <= to_date LOOP
+        partition := format('timesegment_p%s', to_char(month, 'YYYY_MM'));
+        IF to_regclass(partition) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF timesegment FOR VALUES FROM (%L) TO (%L)',
+                partition, month, (month + interval '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        month := (month + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$
+"""
+
+
+def _create_timesegment(name: str, *constraints, **kw) -> None:  # type: ignore[no-untyped-def]
+    op.create_table(
+        name,
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("worklog_id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("notes", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("recorded_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("remittance_id", sa.Uuid(), nullable=True),
+        sa.ForeignKeyConstraint(["worklog_id"], ["worklog.id"], name="timesegment_worklog_id_fkey"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], name="timesegment_user_id_fkey"),
+        sa.ForeignKeyConstraint(
+            ["remittance_id"], ["remittance.id"], name="timesegment_remittance_id_fkey"
+        ),
+        *constraints,
+        **kw,
+    )
+
+
+def _swap_out_timesegment() -> None:
+    """Rename the current table out of the way, freeing its index names."""
+    op.execute("ALTER TABLE timesegment RENAME TO timesegment_old")
+    op.execute("ALTER INDEX timesegment_pkey RENAME TO timesegment_old_pkey")
+    for name, _, _ in INDEXES:
+        op.drop_index(name, table_name="timesegment_old")
+
+
+def _create_indexes() -> None:
+    # built after the copy, once per partition
+    for name, columns, kw in INDEXES:
+        op.create_index(name, "timesegment", columns, unique=False, **kw)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _swap_out_timesegment()
+    _create_timesegment(
+        "timesegment",
+        sa.PrimaryKeyConstraint("id", "start_time", name="timesegment_pkey"),
+        postgresql_partition_by="RANGE (start_time)",
+    )
+    op.execute(CREATE_PARTITIONS_FUNCTION)
+    op.execute("CREATE TABLE timesegment_default PARTITION OF timesegment DEFAULT")
+    op.execute(
+        "SELECT create_timesegment_partitions("
+        "COALESCE((SELECT min(start_time) FROM timesegment_old), now())::date, "
+        "(now() + interval '12 months')::date)"
+    )
+    op.execute(f"INSERT INTO timesegment ({COLUMNS}) SELECT {COLUMNS} FROM timesegment_old")
+    op.drop_table("timesegment_old")
+    _create_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _swap_out_timesegment()
+    _create_timesegment(
+        "timesegment", sa.PrimaryKeyConstraint("id", name="timesegment_pkey")
+    )
+    op.execute(f"INSERT INTO timesegment ({COLUMNS}) SELECT {COLUMNS} FROM timesegment_old")
+    # dropping the partitioned table drops its partitions with it
+    op.drop_table("timesegment_old")
+    op.execute("DROP FUNCTION create_timesegment_partitions(date, date)")
+    _create_indexes()
@@ -8,6 +8,8 @@ from app.api.routes.utils import views as utils_views
 from app.api.routes.tasks import views as tasks_views
 from app.api.routes.worklogs import views as worklog_views
 from app.api.routes.remittance import views as remittance_views
+from app.api.routes.exports import views as exports_views
+from app.api.routes.imports import views as imports_views
 from app.core.config import settings
 
 api_router = APIRouter()
@@ -18,6 +20,8 @@ api_router.include_router(items_views.router)
 api_router.include_router(tasks_views.router)
 api_router.include_router(worklog_views.router)
 api_router.include_router(remittance_views.router)
+api_router.include_router(exports_views.router)
+api_router.include_router(imports_views.router)
 
 
 if settings.ENVIRONMENT == "local":
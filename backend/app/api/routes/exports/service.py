@@ -0,0 +1,108 @@
+import io
+from collections.abc import Iterator
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.models import TimeSegment, WorkLog
+from app.schemas import ExportDatasetIn, ExportFormatIn
+
+TIME_SEGMENT_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("worklog_id", pa.string()),
+        ("user_id", pa.string()),
+        ("remittance_id", pa.string()),
+        ("start_time", pa.timestamp("us")),
+        ("end_time", pa.timestamp("us")),
+        ("description", pa.string()),
+        ("notes", pa.string()),
+        ("recorded_at", pa.timestamp("us")),
+    ]
+)
+
+WORKLOG_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("user_id", pa.string()),
+        ("task_id", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+        ("total_duration_minutes", pa.float64()),
+        ("segment_count", pa.int32()),
+    ]
+)
+
+MEDIA_TYPES = {
+    ExportFormatIn.PARQUET: "application/vnd.apache.parquet",
+    ExportFormatIn.ARROW: "application/vnd.apache.arrow.stream",
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[no-untyped-def]
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        return chunk
+
+
+class ExportService:
+    @staticmethod
+    def export(
+        dataset: ExportDatasetIn, export_format: ExportFormatIn, batch_size: int = 50_000
+    ) -> Iterator[bytes]:
+        """
+        Stream a table as Parquet (one row group per batch) or as an Arrow IPC
+        stream. Rows are read from a server-side cursor `batch_size` at a time
+        and every batch is flushed to the client as soon as it is encoded.
+        The generator owns its session because it outlives the request.
+        """
+        if dataset == ExportDatasetIn.TIME_SEGMENTS:
+            schema, model = TIME_SEGMENT_SCHEMA, TimeSegment
+        else:
+            schema, model = WORKLOG_SCHEMA, WorkLog
+        columns = [getattr(model, name) for name in schema.names]
+
+        sink = _ChunkSink()
+        if export_format == ExportFormatIn.PARQUET:
+            writer = pq.ParquetWriter(sink, schema)
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+
+        with Session(engine) as session:
+            result = session.exec(
+                select(*columns).execution_options(yield_per=batch_size)
+            )
+            for rows in result.partitions():
+                writer.write_batch(ExportService._to_record_batch(rows, schema))
+                yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def _to_record_batch(rows, schema: pa.Schema) -> pa.RecordBatch:  # type: ignore[no-untyped-def]
+        arrays = []
+        for field, values in zip(schema, zip(*rows, strict=True), strict=True):
+            if field.type == pa.string():
+                values = [None if value is None else str(value) for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
@@ -0,0 +1,34 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import get_current_active_superuser
+from app.schemas import ExportDatasetIn, ExportFormatIn
+
+from .service import MEDIA_TYPES, ExportService
+
+router = APIRouter(prefix="/assessment_task", tags=["exports"])
+
+
+@router.get(
+    "/export-analytics",
+    dependencies=[Depends(get_current_active_superuser)],
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+def export_analytics(
+    dataset: ExportDatasetIn = ExportDatasetIn.TIME_SEGMENTS,
+    export_format: Annotated[
+        ExportFormatIn, Query(alias="format")
+    ] = ExportFormatIn.PARQUET,
+) -> StreamingResponse:
+    """
+    Export time segments or worklogs as a columnar Parquet / Arrow IPC file.
+    """
+    filename = f"{dataset.value}.{export_format.value}"
+    return StreamingResponse(
+        ExportService.export(dataset, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
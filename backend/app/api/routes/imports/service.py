@@ -0,0 +1,260 @@
+import csv
+import io
+import json
+import uuid
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, BinaryIO
+from uuid import UUID
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.models import ImportJob
+from app.schemas import ImportFormatIn, ImportJobOut, TimeSegmentImportRowIn
+from app.utils import naive_utc
+
+# validation errors echoed back per upload; the counters carry the rest
+MAX_REPORTED_ERRORS = 100
+
+STAGING_COLUMNS = (
+    "id",
+    "worklog_id",
+    "user_id",
+    "task_id",
+    "start_time",
+    "end_time",
+    "description",
+    "notes",
+)
+
+# One staging table per connection, emptied by every commit.
+CREATE_STAGING = text(
+    """
+    CREATE TEMP TABLE IF NOT EXISTS timesegment_import (
+        id uuid NOT NULL,
+        worklog_id uuid NOT NULL,
+        user_id uuid NOT NULL,
+        task_id uuid NOT NULL,
+        start_time timestamp NOT NULL,
+        end_time timestamp NOT NULL,
+        description varchar,
+        notes varchar
+    ) ON COMMIT DELETE ROWS
+    """
+)
+
+# New worklogs are created, existing ones get the staged minutes and segments
+# added, as long as they belong to the same user and task as the imported rows.
+# `updated_at` is stamped by the database, on the insert and the update alike.
+MERGE_WORKLOGS = text(
+    """
+    INSERT INTO worklog (
+        id, user_id, task_id, created_at, total_duration_minutes, segment_count
+    )
+    SELECT s.worklog_id, s.user_id, s.task_id, :now,
+           SUM(EXTRACT(EPOCH FROM s.end_time - s.start_time) / 60), COUNT(*)
+    FROM timesegment_import s
+    JOIN "user" u ON u.id = s.user_id
+    JOIN task t ON t.id = s.task_id
+    GROUP BY s.worklog_id, s.user_id, s.task_id
+    ON CONFLICT (id) DO UPDATE
+    SET total_duration_minutes = worklog.total_duration_minutes + excluded.total_duration_minutes,
+        segment_count = worklog.segment_count + excluded.segment_count
+    WHERE worklog.user_id = excluded.user_id AND worklog.task_id = excluded.task_id
+    """
+)
+
+# Rows whose worklog was not merged above (unknown user or task, or a worklog
+# owned by someone else) find no match here and count as rejected.
+MERGE_TIME_SEGMENTS = text(
+    """
+    INSERT INTO timesegment (
+        id, worklog_id, user_id, start_time, end_time, description, notes,
+        recorded_at, created_at
+    )
+    SELECT s.id, s.worklog_id, s.user_id, s.start_time, s.end_time, s.description,
+           s.notes, :now, :now
+    FROM timesegment_import s
+    JOIN worklog w
+      ON w.id = s.worklog_id AND w.user_id = s.user_id AND w.task_id = s.task_id
+    """
+)
+
+
+class ImportService:
+    @staticmethod
+    def import_time_segments(
+        session: Session,
+        file: BinaryIO,
+        filename: str | None,
+        import_format: ImportFormatIn | None = None,
+        job_id: UUID | None = None,
+        chunk_size: int = 10_000,
+    ) -> ImportJobOut:
+        """
+        Load historic time segments from a CSV / NDJSON upload.
+
+        Rows are validated `chunk_size` at a time, copied into a temp staging
+        table with `COPY ... FROM STDIN` and merged into `worklog` and
+        `timesegment` with two set-based INSERTs. Every chunk commits together
+        with the job's progress, so an upload that breaks off can be sent again
+        with `job_id` and picks up after the last committed row.
+        """
+        if job_id is not None:
+            job = session.get(ImportJob, job_id)
+            if not job:
+                raise HTTPException(
+                    status_code=404, detail=f"No import job with the id {job_id} found."
+                )
+            if job.status == "COMPLETED":
+                raise HTTPException(
+                    status_code=409, detail=f"Import job {job_id} has already completed."
+                )
+            job.status = "RUNNING"
+            job.error = None
+        else:
+            job = ImportJob(filename=filename)
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+
+        if import_format is None:
+            import_format = ImportService._format_from_filename(filename)
+        rows = islice(
+            ImportService._read_rows(file, import_format), job.rows_committed, None
+        )
+
+        errors: list[str] = []
+        row_number = job.rows_committed
+        try:
+            while chunk := list(islice(rows, chunk_size)):
+                staged = []
+                owners: dict[UUID, tuple[UUID, UUID]] = {}
+                for raw in chunk:
+                    row_number += 1
+                    row, error = ImportService._validate_row(raw, owners)
+                    if error is None:
+                        staged.append(row)
+                    elif len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append(f"row {row_number}: {error}")
+
+                imported = ImportService._merge_chunk(session, staged) if staged else 0
+                job.rows_committed += len(chunk)
+                job.rows_imported += imported
+                job.rows_rejected += len(chunk) - imported
+                job.updated_at = datetime.now(timezone.utc)
+                session.add(job)
+                session.commit()
+        except Exception as exc:
+            session.rollback()
+            job.status = "FAILED"
+            job.error = str(exc)
+            job.updated_at = datetime.now(timezone.utc)
+            session.add(job)
+            session.commit()
+            raise HTTPException(
+                status_code=500,
+                detail=(
+                    f"Import failed after {job.rows_committed} rows; "
+                    f"upload the file again with job_id={job.id} to resume."
+                ),
+            ) from exc
+
+        job.status = "COMPLETED"
+        job.updated_at = datetime.now(timezone.utc)
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return ImportJobOut(**job.model_dump(), errors=errors)
+
+    @staticmethod
+    def get_import_job(session: Session, job_id: UUID) -> ImportJobOut:
+        job = session.get(ImportJob, job_id)
+        if not job:
+            raise HTTPException(
+                status_code=404, detail=f"No import job with the id {job_id} found."
+            )
+        return ImportJobOut(**job.model_dump())
+
+    @staticmethod
+    def _merge_chunk(session: Session, staged: list[tuple[Any, ...]]) -> int:
+        now = datetime.now(timezone.utc)
+        session.exec(CREATE_STAGING)  # type: ignore[call-overload]
+        # COPY runs on the session's own connection, inside its transaction.
+        raw_connection = session.connection().connection.driver_connection
+        with raw_connection.cursor() as cursor:
+            with cursor.copy(
+                f"COPY timesegment_import ({', '.join(STAGING_COLUMNS)}) FROM STDIN"
+            ) as copy:
+                for row in staged:
+                    copy.write_row(row)
+        session.exec(MERGE_WORKLOGS, params={"now": now})  # type: ignore[call-overload]
+        result = session.exec(MERGE_TIME_SEGMENTS, params={"now": now})  # type: ignore[call-overload]
+        return result.rowcount
+
+    @staticmethod
+    def _validate_row(
+        raw: Any, owners: dict[UUID, tuple[UUID, UUID]]
+    ) -> tuple[tuple[Any, ...] | None, str | None]:
+        if isinstance(raw, Exception):
+            return None, str(raw)
+        try:
+            row = TimeSegmentImportRowIn.model_validate(raw)
+        except ValidationError as exc:
+            return None, "; ".join(
+                f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}"
+                for error in exc.errors()
+            )
+        except KeyError as exc:
+            return None, f"missing field {exc}"
+        except (TypeError, ValueError) as exc:
+            return None, str(exc)
+
+        # a worklog may only appear with one user/task pair per chunk, or the
+        # worklog upsert would touch the same row twice
+        owner = owners.setdefault(row.worklog_id, (row.user_id, row.task_id))
+        if owner != (row.user_id, row.task_id):
+            return None, f"worklog {row.worklog_id} already imported for another user or task"
+
+        return (
+            uuid.uuid4(),
+            row.worklog_id,
+            row.user_id,
+            row.task_id,
+            # naive UTC, as the ORM stores it: COPY would otherwise hand the
+            # staging `timestamp` columns the offset, which Postgres drops
+            naive_utc(row.start_time),
+            naive_utc(row.end_time),
+            row.description,
+            row.notes,
+        ), None
+
+    @staticmethod
+    def _read_rows(file: BinaryIO, import_format: ImportFormatIn) -> Iterator[Any]:
+        """Yield one dict per input row, or the exception for an unreadable one."""
+        stream = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        try:
+            if import_format == ImportFormatIn.CSV:
+                for record in csv.DictReader(stream):
+                    # empty CSV cells mean "no value", not an empty string
+                    yield {key: value or None for key, value in record.items()}
+            else:
+                for line in stream:
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        yield ValueError(f"invalid JSON: {exc.msg}")
+        finally:
+            stream.detach()
+
+    @staticmethod
+    def _format_from_filename(filename: str | None) -> ImportFormatIn:
+        if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+            return ImportFormatIn.NDJSON
+        return ImportFormatIn.CSV
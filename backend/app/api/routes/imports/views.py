@@ -0,0 +1,46 @@
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query, UploadFile, status
+
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.schemas import ImportFormatIn, ImportJobOut
+
+from .service import ImportService
+
+router = APIRouter(prefix="/assessment_task", tags=["imports"])
+
+
+@router.post(
+    "/import-time-segments",
+    dependencies=[Depends(get_current_active_superuser)],
+    status_code=status.HTTP_200_OK,
+    response_model=ImportJobOut,
+)
+def import_time_segments(
+    session: SessionDep,
+    file: UploadFile,
+    import_format: Annotated[ImportFormatIn | None, Query(alias="format")] = None,
+    job_id: UUID | None = None,
+    chunk_size: Annotated[int, Query(ge=1, le=100_000)] = 10_000,
+) -> ImportJobOut:
+    """
+    Backfill time segments from a CSV or NDJSON file. Pass the `job_id` of a
+    failed import to resume it after its last committed row.
+    """
+    return ImportService.import_time_segments(
+        session, file.file, file.filename, import_format, job_id, chunk_size
+    )
+
+
+@router.get(
+    "/import-jobs/{job_id}",
+    dependencies=[Depends(get_current_active_superuser)],
+    status_code=status.HTTP_200_OK,
+    response_model=ImportJobOut,
+)
+def get_import_job(session: SessionDep, job_id: UUID) -> ImportJobOut:
+    """
+    Progress of a time segment import.
+    """
+    return ImportService.get_import_job(session, job_id)
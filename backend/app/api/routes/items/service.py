@@ -59,7 +59,6 @@ class ItemService:
         item = Item.model_validate(item_in, update={"owner_id": current_user.id})
         session.add(item)
         session.commit()
-        session.refresh(item)
         return item
 
     @staticmethod
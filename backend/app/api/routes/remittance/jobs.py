@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlmodel import Session, col, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import RemittanceJob
+from app.schemas import RemittanceJobOut
+
+from .service import RemittanceService
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("COMPLETED", "FAILED", "CANCELLED")
+# how often a waiting status request looks at the job again
+WAIT_POLL_SECONDS = 0.5
+
+
+def run_remittance_job(job_id: UUID) -> None:
+    """Execute a pending payout run in its own session."""
+    with Session(engine) as session:
+        # conditional, so a cancel committed meanwhile is not overwritten
+        started = session.exec(  # type: ignore[call-overload]
+            update(RemittanceJob)
+            .where(col(RemittanceJob.id) == job_id, RemittanceJob.status == "PENDING")
+            .values(status="RUNNING", updated_at=datetime.now(timezone.utc))
+        ).rowcount
+        session.commit()
+        job = session.get(RemittanceJob, job_id)
+        if not started or job is None:
+            # cancelled before a worker got to it
+            return
+        processes = remittance_job_runner.process_pool()
+        try:
+            RemittanceService.create_remittances(session, job, processes)
+        except Exception as exc:
+            logger.exception("Remittance job %s failed", job_id)
+            session.rollback()
+            job.status = "FAILED"
+            job.error = str(exc)
+            if isinstance(exc, BrokenProcessPool):
+                # a worker process died (OOM kill, crash); the completed
+                # ranges stay checkpointed and a resume gets a fresh pool
+                remittance_job_runner.discard_process_pool(processes)
+                job.error = "A worker process died during the run; resume it to continue."
+        else:
+            stopped_early = job.users_done < job.users_total
+            job.status = "CANCELLED" if stopped_early else "COMPLETED"
+        job.updated_at = job.finished_at = datetime.now(timezone.utc)
+        session.add(job)
+        session.commit()
+
+
+class RemittanceJobRunner:
+    """
+    Thread pool coordinating the payout runs of this process, and the pool
+    of worker processes settling their user-id ranges. Both are started on
+    first use, the process pool again after a worker died and broke it;
+    jobs still queued at shutdown are marked FAILED and have to be resumed.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._processes: ProcessPoolExecutor | None = None
+        self._queued: dict[UUID, Future[None]] = {}
+
+    def submit(self, job_id: UUID) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.REMITTANCE_JOB_WORKERS,
+                    thread_name_prefix="remittance-job",
+                )
+            future = self._executor.submit(run_remittance_job, job_id)
+            self._queued[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                # spawned, not forked: a fork would copy the parent's threads'
+                # locks and its engine's open connections
+                self._processes = ProcessPoolExecutor(
+                    max_workers=settings.REMITTANCE_JOB_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._processes
+
+    def discard_process_pool(self, processes: ProcessPoolExecutor) -> None:
+        """Drop a broken pool, unless another run has replaced it already."""
+        with self._lock:
+            if self._processes is processes:
+                self._processes = None
+        processes.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Let the running jobs finish, drop the queued ones."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            queued = dict(self._queued)
+        if executor is None:
+            return
+        executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            processes, self._processes = self._processes, None
+        if processes is not None:
+            processes.shutdown(wait=True)
+        dropped = [job_id for job_id, future in queued.items() if future.cancelled()]
+        if dropped:
+            with Session(engine) as session:
+                session.exec(  # type: ignore[call-overload]
+                    update(RemittanceJob)
+                    .where(
+                        col(RemittanceJob.id).in_(dropped),
+                        RemittanceJob.status == "PENDING",
+                    )
+                    .values(
+                        status="FAILED",
+                        error="Interrupted by a shutdown before it started.",
+                        updated_at=datetime.now(timezone.utc),
+                        finished_at=datetime.now(timezone.utc),
+                    )
+                )
+                session.commit()
+
+    def _forget(self, job_id: UUID) -> None:
+        with self._lock:
+            self._queued.pop(job_id, None)
+
+
+remittance_job_runner = RemittanceJobRunner()
+
+
+class RemittanceJobService:
+    @staticmethod
+    def start_remittance_job(
+        session: Session,
+        amount_per_hour: float,
+        start_date: datetime,
+        end_date: datetime,
+    ) -> RemittanceJobOut:
+        """Record a payout run and hand it to the background workers."""
+        job = RemittanceJob(
+            amount_per_hour=amount_per_hour,
+            period_start=start_date,
+            period_end=end_date,
+        )
+        session.add(job)
+        session.commit()
+        remittance_job_runner.submit(job.id)
+        return RemittanceJobOut.model_validate(job)
+
+    @staticmethod
+    def cancel_remittance_job(session: Session, job_id: UUID) -> RemittanceJobOut:
+        """
+        Cancel a job. A pending one is cancelled right away, a running one
+        after the chunk it is working on; remittances of the chunks already
+        committed are kept.
+        """
+        job = RemittanceJobService._get_job(session, job_id, for_update=True)
+        if job.status in FINISHED_STATUSES:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Remittance job {job_id} has already finished ({job.status}).",
+            )
+        now = datetime.now(timezone.utc)
+        job.cancel_requested = True
+        if job.status == "PENDING":
+            job.status = "CANCELLED"
+            job.finished_at = now
+        job.updated_at = now
+        session.add(job)
+        session.commit()
+        return RemittanceJobOut.model_validate(job)
+
+    @staticmethod
+    def resume_remittance_job(session: Session, job_id: UUID) -> RemittanceJobOut:
+        """
+        Run a failed or cancelled job again, or a running one whose process
+        has stopped renewing its lease. Only the user-id ranges it has not
+        completed yet are settled.
+        """
+        job = RemittanceJobService._get_job(session, job_id, for_update=True)
+        if job.status == "RUNNING" and RemittanceJobService._lease_expired(job):
+            # its process died mid-run; completed ranges stay checkpointed
+            job.status = "FAILED"
+        if job.status not in ("FAILED", "CANCELLED"):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Remittance job {job_id} cannot be resumed ({job.status}).",
+            )
+        job.status = "PENDING"
+        job.cancel_requested = False
+        job.error = None
+        job.finished_at = None
+        job.updated_at = datetime.now(timezone.utc)
+        session.add(job)
+        session.commit()
+        remittance_job_runner.submit(job.id)
+        return RemittanceJobOut.model_validate(job)
+
+    @staticmethod
+    def fail_stale_jobs(session: Session) -> int:
+        """
+        Mark the RUNNING jobs whose lease has expired as FAILED, so they can
+        be resumed; run on start. Jobs still PENDING in a process that died
+        can be cancelled and then resumed.
+        """
+        now = datetime.now(timezone.utc)
+        result = session.exec(  # type: ignore[call-overload]
+            update(RemittanceJob)
+            .where(
+                RemittanceJob.status == "RUNNING",
+                RemittanceJob.updated_at < RemittanceJobService._lease_start(now),
+            )
+            .values(
+                status="FAILED",
+                error="Its process stopped during the run; resume it to continue.",
+                updated_at=now,
+                finished_at=now,
+            )
+        )
+        session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def _lease_start(now: datetime) -> datetime:
+        # updated_at is stored without a timezone, in UTC
+        return (now - timedelta(seconds=settings.REMITTANCE_JOB_LEASE_SECONDS)).replace(
+            tzinfo=None
+        )
+
+    @staticmethod
+    def _lease_expired(job: RemittanceJob) -> bool:
+        updated_at = job.updated_at.replace(tzinfo=None)
+        return updated_at < RemittanceJobService._lease_start(datetime.now(timezone.utc))
+
+    @staticmethod
+    def _get_job(
+        session: Session, job_id: UUID, for_update: bool = False
+    ) -> RemittanceJob:
+        job = session.get(RemittanceJob, job_id, with_for_update=for_update)
+        if not job:
+            raise HTTPException(
+                status_code=404, detail=f"No remittance job with the id {job_id} found."
+            )
+        return job
+
+
+class AsyncRemittanceJobService:
+    """Job lookups for the `async def` routes, which may wait on a run."""
+
+    @staticmethod
+    async def get_remittance_job(
+        session: AsyncSession, job_id: UUID, wait: float = 0
+    ) -> RemittanceJobOut:
+        """
+        The job's status and progress. With `wait`, answers as soon as the
+        job has finished or after `wait` seconds, whichever comes first;
+        the connection goes back to the pool between polls.
+        """
+        job = await session.get(RemittanceJob, job_id)
+        if not job:
+            raise HTTPException(
+                status_code=404, detail=f"No remittance job with the id {job_id} found."
+            )
+        deadline = time.monotonic() + wait
+        while job.status not in FINISHED_STATUSES and time.monotonic() < deadline:
+            await session.rollback()
+            await asyncio.sleep(WAIT_POLL_SECONDS)
+            await session.refresh(job)
+        return RemittanceJobOut.model_validate(job)
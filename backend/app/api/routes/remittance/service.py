@@ -1,66 +1,316 @@
-from datetime import date, datetime
+from collections.abc import Sequence
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from datetime import date, datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
 from typing import List
+from uuid import UUID, uuid4
 from app.api.deps import CurrentUser
-from app.schemas import RemittanceSchemaOut, TaskCreateIn, TaskOut, TimeSegmentOut
+from app.schemas import (
+    RemittanceOut,
+    RemittancePageOut,
+    TaskCreateIn,
+    TaskOut,
+    TimeSegmentOut,
+)
+from app.utils import decode_cursor, encode_cursor
 
 from fastapi import HTTPException
-from sqlalchemy import func, select
-from sqlmodel import Session, select
-from app.models import Remittance, Task, TimeSegment, User, WorkLog
+from sqlalchemy import (
+    ARRAY,
+    ColumnElement,
+    Uuid,
+    any_,
+    column,
+    literal,
+    extract,
+    func,
+    insert,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlmodel import Session, col, select
+from app.core.config import settings
+from app.core.db import engine
+from app.models import (
+    Remittance,
+    RemittanceJob,
+    RemittanceJobChunk,
+    Task,
+    TimeSegment,
+    User,
+    WorkLog,
+)
 from sqlalchemy import and_
 
 
+# decimal places of a payout amount
+CENT = Decimal("0.01")
+# how often a coordinating run renews its lease and looks for a cancellation
+CANCEL_POLL_SECONDS = 1
+
+
 class RemittanceService:
     @staticmethod
     def create_remittances(
-        session: Session,
-        amount_per_hour: float,
-        start_date: datetime,
-        end_date: datetime,
-    ) -> RemittanceSchemaOut:
+        session: Session, job: RemittanceJob, executor: Executor
+    ) -> int:
         """
-        Create remitance for users.
+        Settle the payout run `job` and return how many remittances it has
+        created so far.
+
+        Only segments no remittance has paid yet are settled, so running
+        the same period again pays just the time logged since, and the scan
+        stays on the partial index of unpaid segments instead of the history.
+
+        The users with such time in the period are split into id ranges of
+        REMITTANCE_JOB_CHUNK_SIZE users, recorded as checkpoints on the
+        first run. The ranges not completed yet are settled in `executor`
+        (worker processes with their own engine), each committing its
+        remittances together with its checkpoint and the job's progress, so
+        a failed or cancelled run can be resumed where it stopped. While
+        waiting for them the job's `updated_at` is kept fresh, which is the
+        lease telling a live run from one whose process has died.
         """
-        remittances = []
-
-        # Fetch all user IDs
-        user_ids = session.exec(select(WorkLog.user_id)).all()
-
-        for user_id in user_ids:
-            # Sum duration in minutes in SQL
-            total_minutes_worked = session.exec(
-                select(func.coalesce(func.sum(WorkLog.total_duration_minutes), 0))
-                .where(
-                    and_(
-                        TimeSegment.user_id == user_id,
-                        TimeSegment.start_time >= start_date,
-                        TimeSegment.end_time <= end_date,
-                    )
+        chunks = RemittanceService._plan_chunks(session, job)
+        futures = {
+            executor.submit(settle_remittance_chunk, job.id, chunk.index)
+            for chunk in chunks
+            if chunk.status != "COMPLETED"
+        }
+        try:
+            while futures:
+                done, futures = wait(
+                    futures, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED
                 )
-                .join(TimeSegment, TimeSegment.user_id == WorkLog.user_id)
-            ).one()
+                for future in done:
+                    future.result()
+                RemittanceService._heartbeat(session, job)
+                if job.cancel_requested:
+                    break
+        finally:
+            # ranges already being settled commit, the others are left over
+            for future in futures:
+                future.cancel()
+            wait(futures)
+        session.refresh(job)
+        return job.remittances_created
 
-            # Calculate payment
-            total_payment = total_minutes_worked / 60 * amount_per_hour
+    @staticmethod
+    def _heartbeat(session: Session, job: RemittanceJob) -> None:
+        """Renew the job's lease and read its current cancellation flag."""
+        session.exec(  # type: ignore[call-overload]
+            update(RemittanceJob)
+            .where(col(RemittanceJob.id) == job.id)
+            .values(updated_at=datetime.now(timezone.utc))
+        )
+        session.commit()
+        session.refresh(job)
 
-            # Create remittance
-            remittance = Remittance(
-                user_id=user_id,
-                total_amount=total_payment,
-                status="PENDING",
-                period_start=start_date,
-                period_end=end_date,
+    @staticmethod
+    def _plan_chunks(
+        session: Session, job: RemittanceJob
+    ) -> Sequence[RemittanceJobChunk]:
+        chunks = session.exec(
+            select(RemittanceJobChunk)
+            .where(RemittanceJobChunk.job_id == job.id)
+            .order_by(RemittanceJobChunk.index)
+        ).all()
+        if chunks:
+            return chunks
+
+        user_ids = session.exec(
+            select(TimeSegment.user_id)
+            .where(
+                col(TimeSegment.remittance_id).is_(None),
+                TimeSegment.start_time >= job.period_start,
+                TimeSegment.end_time <= job.period_end,
+            )
+            .distinct()
+            .order_by(TimeSegment.user_id)
+        ).all()
+        chunk_size = settings.REMITTANCE_JOB_CHUNK_SIZE
+        chunks = [
+            RemittanceJobChunk(
+                job_id=job.id,
+                index=index,
+                first_user_id=ids[0],
+                last_user_id=ids[-1],
+                users=len(ids),
             )
-            remittances.append(remittance)
-            session.add_all(remittances)
-            session.commit()
+            for index, ids in enumerate(
+                user_ids[offset:offset + chunk_size]
+                for offset in range(0, len(user_ids), chunk_size)
+            )
+        ]
+        session.add_all(chunks)
+        job.users_total = len(user_ids)
+        job.updated_at = datetime.now(timezone.utc)
+        session.add(job)
+        session.commit()
+        return chunks
 
-        return RemittanceSchemaOut(detail='Data successfully saved.')
+    @staticmethod
+    def _settle_chunk(
+        session: Session, job: RemittanceJob, chunk: RemittanceJobChunk
+    ) -> int:
+        """
+        Create the remittances of one user-id range: the minutes come from
+        one GROUP BY, the amounts are computed here, and the remittances and
+        the stamping of their segments are written with one statement each.
+        """
+        now = datetime.now(timezone.utc)
+        in_chunk = and_(
+            col(TimeSegment.remittance_id).is_(None),
+            TimeSegment.start_time >= job.period_start,
+            TimeSegment.end_time <= job.period_end,
+            col(TimeSegment.user_id).between(chunk.first_user_id, chunk.last_user_id),
+        )
+        # a concurrent run over the same period waits here, then finds the
+        # segments paid and skips them
+        locked_ids = session.exec(
+            select(TimeSegment.id).where(in_chunk).with_for_update()
+        ).all()
+        # totals and stamping cover exactly the locked segments: one that
+        # commits after the lock is left unpaid for the next run to settle
+        locked = and_(
+            in_chunk, col(TimeSegment.id) == any_(literal(list(locked_ids), ARRAY(Uuid)))
+        )
+        seconds = func.sum(
+            extract("epoch", TimeSegment.end_time - TimeSegment.start_time)
+        )
+        totals = session.exec(
+            select(TimeSegment.user_id, seconds).where(locked).group_by(TimeSegment.user_id)
+        ).all()
+        rate = Decimal(str(job.amount_per_hour))
+        remittances = [
+            {
+                "id": uuid4(),
+                "user_id": user_id,
+                "total_amount": float(RemittanceService._amount_due(total, rate)),
+                "status": "PENDING",
+                "period_start": job.period_start,
+                "period_end": job.period_end,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for user_id, total in totals
+        ]
+        if remittances:
+            session.exec(insert(Remittance), params=remittances)  # type: ignore[call-overload]
+            paid = values(
+                column("user_id", Uuid), column("remittance_id", Uuid), name="paid"
+            ).data([(remittance["user_id"], remittance["id"]) for remittance in remittances])
+            session.exec(  # type: ignore[call-overload]
+                update(TimeSegment)
+                .where(locked, col(TimeSegment.user_id) == paid.c.user_id)
+                .values(remittance_id=paid.c.remittance_id)
+                .execution_options(synchronize_session=False)
+            )
+
+        chunk.status = "COMPLETED"
+        chunk.remittances_created = len(remittances)
+        chunk.finished_at = now
+        session.add(chunk)
+        session.exec(  # type: ignore[call-overload]
+            update(RemittanceJob)
+            .where(col(RemittanceJob.id) == job.id)
+            .values(
+                users_done=RemittanceJob.users_done + chunk.users,
+                remittances_created=RemittanceJob.remittances_created + len(remittances),
+                updated_at=now,
+            )
+        )
+        session.commit()
+        return len(remittances)
+
+    @staticmethod
+    def _amount_due(seconds: Decimal, amount_per_hour: Decimal) -> Decimal:
+        """A user's payout for `seconds` of work, rounded half up to the cent."""
+        return (Decimal(seconds) / 3600 * amount_per_hour).quantize(
+            CENT, rounding=ROUND_HALF_UP
+        )
 
     @staticmethod
     def get_all_remittences(
-        session: Session
-    ):
-        """gets all remittances"""
-        remittances = session.exec(select(Remittance)).all()
-        return remittances
+        session: Session,
+        status: str | None = None,
+        user_id: UUID | None = None,
+        period_from: datetime | None = None,
+        period_to: datetime | None = None,
+        limit: int = 100,
+        cursor: str | None = None,
+    ) -> RemittancePageOut:
+        """
+        Get one page of remittances, ordered by `(created_at, id)`.
+        - `status`, `user_id`: only remittances with this status / of this user.
+        - `period_from`, `period_to`: only periods ending within `[period_from, period_to)`.
+        - `cursor`: the `next_cursor` returned with the previous page.
+
+        Every page is a bounded range scan of `ix_remittance_created_at_id`.
+        The first page also carries the count and sum of all matches, one
+        aggregate over `ix_remittance_status_period_end`.
+        """
+        filters: list[ColumnElement[bool]] = []
+        if status is not None:
+            filters.append(Remittance.status == status)
+        if user_id is not None:
+            filters.append(Remittance.user_id == user_id)
+        if period_from is not None:
+            filters.append(Remittance.period_end >= period_from)
+        if period_to is not None:
+            filters.append(Remittance.period_end < period_to)
+
+        count = total_amount = None
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                raise HTTPException(status_code=400, detail="Invalid cursor.")
+            page_filters = [*filters, tuple_(Remittance.created_at, Remittance.id) > position]
+        else:
+            page_filters = filters
+            count, total_amount = session.exec(
+                select(func.count(), func.coalesce(func.sum(Remittance.total_amount), 0))
+                .select_from(Remittance)
+                .where(*filters)
+            ).one()
+
+        # fetch one extra row to know whether another page follows
+        remittances = session.exec(
+            select(Remittance)
+            .where(*page_filters)
+            .order_by(Remittance.created_at, Remittance.id)
+            .limit(limit + 1)
+        ).all()
+        next_cursor = None
+        if len(remittances) > limit:
+            remittances = remittances[:limit]
+            last = remittances[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+        return RemittancePageOut(
+            data=[RemittanceOut.model_validate(remittance) for remittance in remittances],
+            next_cursor=next_cursor,
+            count=count,
+            total_amount=total_amount,
+        )
+
+
+def settle_remittance_chunk(job_id: UUID, index: int) -> int:
+    """
+    Entry point of the worker processes: settle one user-id range of a run
+    with this process's own engine. A range already completed, or one of a
+    run cancelled meanwhile, is left alone.
+    """
+    with Session(engine) as session:
+        chunk = session.get(RemittanceJobChunk, (job_id, index), with_for_update=True)
+        job = session.get(RemittanceJob, job_id)
+        if (
+            chunk is None
+            or job is None
+            or chunk.status == "COMPLETED"
+            or job.cancel_requested
+        ):
+            return 0
+        return RemittanceService._settle_chunk(session, job, chunk)
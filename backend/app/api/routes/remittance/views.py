@@ -1,9 +1,11 @@
 from datetime import datetime
-from fastapi import APIRouter, Body, status
-from app.schemas import RemittanceSchemaOut, TaskCreateIn, TaskOut
+from uuid import UUID
+from fastapi import APIRouter, Body, Query, status
+from app.schemas import RemittanceJobOut, RemittancePageOut, TaskCreateIn, TaskOut
+from .jobs import AsyncRemittanceJobService, RemittanceJobService
 from .service import RemittanceService
 from fastapi import APIRouter
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import AsyncSessionDep, CurrentUser, SessionDep
 from fastapi import status
 from typing import Annotated
 
@@ -11,29 +13,75 @@ router = APIRouter(prefix="/assessment_task", tags=["remittance"])
 
 
 @router.post("/generate-remittances-for-all-users",
-             status_code=status.HTTP_201_CREATED,
-             response_model=RemittanceSchemaOut)
+             status_code=status.HTTP_202_ACCEPTED,
+             response_model=RemittanceJobOut)
 def create_remittance(
     amount_per_hour: Annotated[float, Body()],
     start_date: Annotated[datetime, Body()],
     end_date: Annotated[datetime, Body()],
     session: SessionDep,
 
-) -> RemittanceSchemaOut:
+) -> RemittanceJobOut:
     """
-    Create a remittance.
+    Start a payout run in the background; follow it with `/remittance-jobs/{job_id}`.
     """
-    return RemittanceService.create_remittances(session, amount_per_hour, start_date, end_date)
+    return RemittanceJobService.start_remittance_job(
+        session, amount_per_hour, start_date, end_date
+    )
+
+
+@router.get("/remittance-jobs/{job_id}",
+            status_code=status.HTTP_200_OK,
+            response_model=RemittanceJobOut)
+async def get_remittance_job(
+    session: AsyncSessionDep,
+    job_id: UUID,
+    wait: Annotated[float, Query(ge=0, le=60)] = 0,
+) -> RemittanceJobOut:
+    """
+    Status and progress of a payout run. Pass `wait` (seconds) to hold the
+    request until the run has finished; waiting does not tie up a worker
+    thread.
+    """
+    return await AsyncRemittanceJobService.get_remittance_job(session, job_id, wait)
+
+
+@router.post("/remittance-jobs/{job_id}/cancel",
+             status_code=status.HTTP_200_OK,
+             response_model=RemittanceJobOut)
+def cancel_remittance_job(session: SessionDep, job_id: UUID) -> RemittanceJobOut:
+    """
+    Cancel a payout run that has not finished yet.
+    """
+    return RemittanceJobService.cancel_remittance_job(session, job_id)
+
+
+@router.post("/remittance-jobs/{job_id}/resume",
+             status_code=status.HTTP_202_ACCEPTED,
+             response_model=RemittanceJobOut)
+def resume_remittance_job(session: SessionDep, job_id: UUID) -> RemittanceJobOut:
+    """
+    Resume a failed or cancelled payout run after its last completed user range.
+    """
+    return RemittanceJobService.resume_remittance_job(session, job_id)
 
 
 @router.get("/get-all-remittances",
-            status_code=status.HTTP_200_OK)
+            status_code=status.HTTP_200_OK,
+            response_model=RemittancePageOut)
 def get_all_remittances(
-
     session: SessionDep,
-
-):
+    remittance_status: Annotated[str | None, Query(alias="status")] = None,
+    user_id: UUID | None = None,
+    period_from: datetime | None = None,
+    period_to: datetime | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: str | None = None,
+) -> RemittancePageOut:
     """
-    get all remittances.
+    Get one page of remittances, optionally filtered by status, user and
+    periods ending within `[period_from, period_to)`.
     """
-    return RemittanceService.get_all_remittences(session)
+    return RemittanceService.get_all_remittences(
+        session, remittance_status, user_id, period_from, period_to, limit, cursor
+    )
@@ -4,7 +4,7 @@ from app.schemas import TaskCreateIn, TaskOut
 
 from fastapi import HTTPException
 from sqlalchemy import select
-from sqlmodel import Session, select
+from sqlmodel import Session, func, select
 from app.models import Task
 
 
@@ -17,9 +17,16 @@ class TaskService:
         task = Task.model_validate(task_in)
         session.add(task)
         session.commit()
-        session.refresh(task)
         return task
 
+    @staticmethod
+    def get_tasks_version(session: Session) -> str:
+        """Cheap version token of the task listing: row count and latest `updated_at`."""
+        version = session.exec(
+            select(func.count(), func.max(Task.updated_at)).select_from(Task)
+        ).one()
+        return ":".join(map(str, version))
+
     @staticmethod
     def get_all_tasks(session: Session) -> list[TaskOut]:
         """
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, status
+from typing import Annotated, Any
+from fastapi import APIRouter, Header, Response, status
 from app.schemas import TaskCreateIn, TaskOut
+from app.utils import etag_matches, make_etag
 from .service import TaskService
 from fastapi import APIRouter
 from app.api.deps import SessionDep
@@ -23,11 +25,19 @@ def create_task(
 
 @router.get("/get-all-tasks",
             status_code=status.HTTP_200_OK,
-            response_model=list[TaskOut])
+            response_model=list[TaskOut],
+            responses={304: {"description": "Not modified"}})
 def get_all_tasks(
     session: SessionDep,
-) -> list[TaskOut]:
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Any:
     """
-    Get all tasks.
+    Get all tasks. Send the last `ETag` back in `If-None-Match` to get a
+    `304 Not Modified` while nothing changed.
     """
+    etag = make_etag(TaskService.get_tasks_version(session))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return TaskService.get_all_tasks(session)
@@ -1,27 +1,98 @@
+import hashlib
+import json
 import uuid
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Iterator
+from typing import NoReturn
+from datetime import datetime, timedelta, timezone
 from app.schemas import (
+    ChangeFeedOut,
     DeleteTimeSegmentOut,
+    RemittanceStatusSchemaIn,
+    TimeSegmentBatchOut,
+    TimeSegmentBatchUpdateIn,
     TimeSegmentOut,
+    TimeSegmentPageOut,
+    TombstoneOut,
     UpdateTimeSegmentIn,
+    WorkLogBulkCreateIn,
+    WorkLogBulkCreateOut,
     WorkLogCreateIn,
     TimeSegmentIn,
     WorkLogOut,
+    WorkLogPageOut,
+    WorkLogSummaryGroupByIn,
+    WorkLogSummaryOut,
+    WorkLogSummaryRowOut,
     UpdateTimeSegmentOut,
 )
 from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlmodel import Session, col, delete, select
-from app.models import WorkLog, TimeSegment, Task
-from app.api.deps import CurrentUser
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models import IdempotencyKey, WorkLog, TimeSegment, Task, Tombstone, User
+from app.api.deps import AsyncCurrentUser, CurrentUser
+from app.core.config import settings
+from app.core.db import engine
+from app.utils import decode_cursor, encode_cursor, naive_utc
+from sqlalchemy import (
+    ColumnElement,
+    DateTime,
+    Float,
+    Integer,
+    String,
+    Uuid,
+    and_,
+    column,
+    distinct,
+    exists,
+    extract,
+    func,
+    insert,
+    literal,
+    text,
+    true,
+    tuple_,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 
+# Changes stamped before this are settled. The stamp triggers take the
+# transaction id before reading the clock, so a change that is still
+# uncommitted is never older than the start of a transaction listed here as
+# writing; one not listed yet stamps its rows after this statement began.
+# Assumes the writers connect as the same role, whose sessions it can see.
+CHANGE_FEED_HORIZON = text(
+    """
+    SELECT least(
+        statement_timestamp(),
+        (
+            SELECT min(xact_start)
+            FROM pg_stat_activity
+            WHERE datname = current_database()
+              AND backend_xid IS NOT NULL
+              AND pid <> pg_backend_pid()
+        )
+    ) AT TIME ZONE 'UTC'
+    """
+)
+
 
 class WorklogService:
     @staticmethod
     def create_worklog(
-        session: Session, worklog_in: WorkLogCreateIn, current_user: CurrentUser
+        session: Session,
+        worklog_in: WorkLogCreateIn,
+        current_user: CurrentUser,
+        commit: bool = True,
     ):
         """
-        Create new worklog.
+        Create new worklog. With `commit=False` it is only flushed, for a
+        caller that commits it together with writes of its own.
         """
         # validating against the db the task_id provided by the user
         task = session.exec(
@@ -32,21 +103,33 @@ class WorklogService:
                 status_code=404,
                 detail=f"No task with the id {worklog_in.task_id} found.",
             )
-        # add together all the worked time
-        total_duration_minutes = sum(
-            (ts.end_time - ts.start_time).total_seconds() / 60
-            for ts in worklog_in.time_segments
+        WorklogService._check_overlaps(
+            session,
+            current_user.id,
+            [(ts.start_time, ts.end_time) for ts in worklog_in.time_segments],
         )
+        worklog = WorklogService._build_worklog(worklog_in, current_user)
 
-        worklog = WorkLog(
+        session.add(worklog)
+        if commit:
+            session.commit()
+        else:
+            session.flush()
+        return worklog
+
+    @staticmethod
+    def _build_worklog(worklog_in: WorkLogCreateIn, current_user: User) -> WorkLog:
+        return WorkLog(
             user_id=current_user.id,
             task_id=worklog_in.task_id,
-            total_duration_minutes=total_duration_minutes,
+            # add together all the worked time
+            total_duration_minutes=WorklogService._total_minutes(worklog_in),
+            segment_count=len(worklog_in.time_segments),
             time_segments=[
                 TimeSegment(
                     user_id=current_user.id,
-                    start_time=ts.start_time,
-                    end_time=ts.end_time,
+                    start_time=naive_utc(ts.start_time),
+                    end_time=naive_utc(ts.end_time),
                     description=ts.description,
                     notes=ts.notes,
                 )
@@ -54,78 +137,628 @@ class WorklogService:
             ],
         )
 
-        session.add(worklog)
-        session.commit()
-        session.refresh(worklog)
-        return worklog
+    @staticmethod
+    def create_worklogs_bulk(
+        session: Session,
+        worklogs_in: WorkLogBulkCreateIn,
+        current_user: CurrentUser,
+        commit: bool = True,
+    ) -> WorkLogBulkCreateOut:
+        """
+        Create many worklogs at once: one `IN` query validates every task id,
+        then worklogs and segments are written with two multi-row INSERTs in a
+        single transaction instead of an add/commit/refresh per worklog.
+        With `commit=False` that transaction is left open for the caller.
+        """
+        task_ids = {worklog_in.task_id for worklog_in in worklogs_in.worklogs}
+        found = set(session.exec(select(Task.id).where(col(Task.id).in_(task_ids))).all())
+        missing = task_ids - found
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No tasks with the ids {', '.join(sorted(map(str, missing)))} found.",
+            )
+
+        WorklogService._check_overlaps(
+            session,
+            current_user.id,
+            [
+                (ts.start_time, ts.end_time)
+                for worklog_in in worklogs_in.worklogs
+                for ts in worklog_in.time_segments
+            ],
+        )
+
+        now = datetime.now(timezone.utc)
+        worklog_rows = []
+        segment_rows = []
+        for worklog_in in worklogs_in.worklogs:
+            worklog_id = uuid.uuid4()
+            worklog_rows.append(
+                {
+                    "id": worklog_id,
+                    "user_id": current_user.id,
+                    "task_id": worklog_in.task_id,
+                    "created_at": now,
+                    "total_duration_minutes": WorklogService._total_minutes(worklog_in),
+                    "segment_count": len(worklog_in.time_segments),
+                }
+            )
+            segment_rows.extend(
+                {
+                    "id": uuid.uuid4(),
+                    "worklog_id": worklog_id,
+                    "user_id": current_user.id,
+                    "start_time": ts.start_time,
+                    "end_time": ts.end_time,
+                    "description": ts.description,
+                    "notes": ts.notes,
+                    "recorded_at": now,
+                    "created_at": now,
+                }
+                for ts in worklog_in.time_segments
+            )
+
+        session.exec(insert(WorkLog), params=worklog_rows)
+        if segment_rows:
+            session.exec(insert(TimeSegment), params=segment_rows)
+        if commit:
+            session.commit()
+        return WorkLogBulkCreateOut(
+            ids=[row["id"] for row in worklog_rows], count=len(worklog_rows)
+        )
 
     @staticmethod
-    def get_all_wroklogs(session: Session) -> list[WorkLogOut]:
+    def _total_minutes(worklog_in: WorkLogCreateIn) -> float:
+        return sum(
+            (ts.end_time - ts.start_time).total_seconds() / 60
+            for ts in worklog_in.time_segments
+        )
+
+    @staticmethod
+    def get_all_wroklogs(
+        session: Session,
+        remittance_status: RemittanceStatusSchemaIn | None = None,
+        limit: int = 100,
+        cursor: str | None = None,
+        include_segments: bool = True,
+    ) -> WorkLogPageOut:
         """
-        Get all the worklogs.
+        Get one page of worklogs, ordered by `(created_at, id)`.
         - `remittanceStatus`: Filter by remittance status. Accepts `REMITTED` or `UNREMITTED`.
+        - `cursor`: the `next_cursor` returned with the previous page.
+        - `include_segments`: when false the time segments are not loaded at all.
+        """
+        filters = []
+        if remittance_status is not None:
+            filters.append(WorklogService._remittance_status_clause(remittance_status))
+        return WorklogService._paginate_worklogs(
+            session, filters, limit, cursor, include_segments
+        )
+
+    @staticmethod
+    def get_worklogs_version(session: Session) -> str:
         """
+        Cheap version token of the worklog listing: row counts and latest
+        `updated_at` of worklogs and time segments, read from their indexes.
+        Any insert, update or delete changes at least one of them.
+        """
+        version = session.exec(
+            select(
+                select(func.count()).select_from(WorkLog).scalar_subquery(),
+                select(func.max(WorkLog.updated_at)).scalar_subquery(),
+                select(func.count()).select_from(TimeSegment).scalar_subquery(),
+                select(func.max(TimeSegment.updated_at)).scalar_subquery(),
+            )
+        ).one()
+        return ":".join(map(str, version))
+
+    @staticmethod
+    def query_worklogs(
+        session: Session,
+        user_id: uuid.UUID | None = None,
+        task_id: uuid.UUID | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        limit: int = 100,
+        cursor: str | None = None,
+        include_segments: bool = True,
+    ) -> WorkLogPageOut:
+        """
+        Get one page of the worklogs of a user and/or task created within a
+        date range. The `(user_id, created_at, id)` and `(task_id, created_at, id)`
+        indexes turn each page into a range scan of the matching rows only.
+        """
+        filters = []
+        if user_id is not None:
+            filters.append(WorkLog.user_id == user_id)
+        if task_id is not None:
+            filters.append(WorkLog.task_id == task_id)
+        if created_from is not None:
+            filters.append(WorkLog.created_at >= created_from)
+        if created_to is not None:
+            filters.append(WorkLog.created_at < created_to)
+        return WorklogService._paginate_worklogs(
+            session, filters, limit, cursor, include_segments
+        )
+
+    @staticmethod
+    def get_changes(
+        session: Session, since: str | None = None, limit: int = 500
+    ) -> ChangeFeedOut:
+        """
+        Incremental change feed over worklogs, time segments and tombstones.
+        Each table contributes an index range scan on its change timestamp
+        past the cursor; the union is ordered by `(changed_at, id)` so a
+        consumer can resume exactly where it stopped. Changes newer than the
+        oldest open writing transaction are held back until it has finished,
+        however long it runs.
+        """
+        position = None
+        if since:
+            position = decode_cursor(since)
+            if position is None:
+                raise HTTPException(status_code=400, detail="Invalid cursor.")
+        settled = session.exec(CHANGE_FEED_HORIZON).scalar_one()  # type: ignore[call-overload]
+
+        branches = []
+        for kind, id_column, changed_at in (
+            ("worklog", WorkLog.id, WorkLog.updated_at),
+            ("time_segment", TimeSegment.id, TimeSegment.updated_at),
+            ("tombstone", Tombstone.id, Tombstone.deleted_at),
+        ):
+            branch = select(
+                literal(kind).label("kind"),
+                id_column.label("id"),
+                changed_at.label("changed_at"),
+            ).where(changed_at < settled)
+            if position is not None:
+                branch = branch.where(tuple_(changed_at, id_column) > position)
+            branches.append(
+                branch.order_by(changed_at, id_column).limit(limit + 1)
+            )
+        changes = union_all(*branches).subquery()
+        rows = session.exec(
+            select(changes.c.kind, changes.c.id, changes.c.changed_at)
+            .order_by(changes.c.changed_at, changes.c.id)
+            .limit(limit + 1)
+        ).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        ids: dict[str, list[uuid.UUID]] = defaultdict(list)
+        for kind, row_id, _ in rows:
+            ids[kind].append(row_id)
+
         worklogs = session.exec(
-            select(WorkLog).options(
-                selectinload(WorkLog.time_segments))
+            select(WorkLog)
+            .where(col(WorkLog.id).in_(ids["worklog"]))
+            .order_by(WorkLog.updated_at, WorkLog.id)
+        ).all()
+        time_segments = session.exec(
+            select(TimeSegment)
+            .where(col(TimeSegment.id).in_(ids["time_segment"]))
+            .order_by(TimeSegment.updated_at, TimeSegment.id)
+        ).all()
+        tombstones = session.exec(
+            select(Tombstone)
+            .where(col(Tombstone.id).in_(ids["tombstone"]))
+            .order_by(Tombstone.deleted_at, Tombstone.id)
         ).all()
 
-        return [
-            WorkLogOut(
+        if rows:
+            next_cursor = encode_cursor(rows[-1][2], rows[-1][1])
+        else:
+            next_cursor = since
+        return ChangeFeedOut(
+            worklogs=[
+                WorklogService._to_worklog_out(worklog, include_segments=False)
+                for worklog in worklogs
+            ],
+            time_segments=[
+                WorklogService._to_time_segment_out(ts) for ts in time_segments
+            ],
+            deleted=[
+                TombstoneOut(
+                    entity=tombstone.entity,
+                    entity_id=tombstone.entity_id,
+                    deleted_at=tombstone.deleted_at,
+                )
+                for tombstone in tombstones
+            ],
+            next_cursor=next_cursor,
+            has_more=has_more,
+        )
+
+    @staticmethod
+    def get_worklogs_summary(
+        session: Session,
+        group_by: WorkLogSummaryGroupByIn,
+        start_from: datetime | None = None,
+        start_to: datetime | None = None,
+    ) -> WorkLogSummaryOut:
+        """
+        Worked time per user, task or day, aggregated in a single query over
+        the time segments (optionally only those starting within
+        `[start_from, start_to)`) joined to their worklogs.
+        """
+        if group_by == WorkLogSummaryGroupByIn.USER:
+            key = WorkLog.user_id
+        elif group_by == WorkLogSummaryGroupByIn.TASK:
+            key = WorkLog.task_id
+        else:
+            key = func.date_trunc("day", TimeSegment.start_time)
+
+        duration_seconds = extract("epoch", TimeSegment.end_time - TimeSegment.start_time)
+        statement = (
+            select(
+                key,
+                func.sum(duration_seconds) / 60,
+                func.count(distinct(WorkLog.id)),
+                func.count(TimeSegment.id),
+                func.min(TimeSegment.start_time),
+                func.max(TimeSegment.end_time),
+            )
+            .join(WorkLog, WorkLog.id == TimeSegment.worklog_id)
+            .group_by(key)
+            .order_by(key)
+        )
+        if start_from is not None:
+            statement = statement.where(TimeSegment.start_time >= start_from)
+        if start_to is not None:
+            statement = statement.where(TimeSegment.start_time < start_to)
+
+        return WorkLogSummaryOut(
+            group_by=group_by,
+            data=[
+                WorkLogSummaryRowOut(
+                    key=key_value.date().isoformat()
+                    if group_by == WorkLogSummaryGroupByIn.DAY
+                    else str(key_value),
+                    total_duration_minutes=total_minutes,
+                    worklog_count=worklog_count,
+                    segment_count=segment_count,
+                    first_start_time=first_start_time,
+                    last_end_time=last_end_time,
+                )
+                for (
+                    key_value,
+                    total_minutes,
+                    worklog_count,
+                    segment_count,
+                    first_start_time,
+                    last_end_time,
+                ) in session.exec(statement).all()
+            ],
+        )
+
+    @staticmethod
+    def parse_worklog_fields(fields: str | None) -> set[str] | None:
+        """Validate a comma-separated `fields` selection against `WorkLogOut`."""
+        if not fields:
+            return None
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected - WorkLogOut.model_fields.keys()
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown worklog fields: {', '.join(sorted(unknown))}.",
+            )
+        return selected
+
+    @staticmethod
+    def dump_worklog_fields(page: WorkLogPageOut, fields: set[str]) -> dict:
+        """Serialize `page` keeping only the selected worklog fields."""
+        return page.model_dump(
+            mode="json", include={"data": {"__all__": fields}, "next_cursor": True}
+        )
+
+    @staticmethod
+    def _remittance_status_clause(
+        remittance_status: RemittanceStatusSchemaIn,
+    ) -> ColumnElement[bool]:
+        """
+        A worklog is UNREMITTED while any of its segments is unpaid and
+        REMITTED once it has segments and all of them are paid. Both probe
+        `ix_timesegment_unremitted_worklog_id`, which only holds open work.
+        """
+        unremitted = exists().where(
+            TimeSegment.worklog_id == WorkLog.id,
+            col(TimeSegment.remittance_id).is_(None),
+        )
+        if remittance_status == RemittanceStatusSchemaIn.UNREMITTED:
+            return unremitted
+        return and_(
+            exists().where(TimeSegment.worklog_id == WorkLog.id), ~unremitted
+        )
+
+    @staticmethod
+    def stream_worklogs(batch_size: int = 1000) -> Iterator[str]:
+        """
+        Yield every worklog, with its time segments, as one NDJSON line.
+        Rows come from a server-side cursor `batch_size` at a time, so memory
+        stays flat however large the table is. The generator owns its session
+        because it keeps reading after the request dependency has closed.
+        """
+        with Session(engine) as session:
+            statement = (
+                select(WorkLog)
+                .options(selectinload(WorkLog.time_segments))
+                .execution_options(yield_per=batch_size)
+            )
+            for worklog in session.exec(statement):
+                worklog_out = WorklogService._to_worklog_out(worklog)
+                yield worklog_out.model_dump_json() + "\n"
+
+    @staticmethod
+    def _paginate_worklogs(
+        session: Session,
+        filters: list[ColumnElement[bool]],
+        limit: int,
+        cursor: str | None,
+        include_segments: bool = True,
+    ) -> WorkLogPageOut:
+        """
+        Keyset pagination over `(created_at, id)`: every page is a bounded
+        range scan of `ix_worklog_created_at_id`, whatever its depth.
+        Without segments the children are not queried at all; totals and
+        `segment_count` are stored on the worklog itself.
+        """
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                raise HTTPException(status_code=400, detail="Invalid cursor.")
+            filters = [*filters, tuple_(WorkLog.created_at, WorkLog.id) > position]
+        # fetch one extra row to know whether another page follows
+        statement = (
+            select(WorkLog)
+            .where(*filters)
+            .order_by(WorkLog.created_at, WorkLog.id)
+            .limit(limit + 1)
+        )
+        if include_segments:
+            statement = statement.options(selectinload(WorkLog.time_segments))
+        worklogs = session.exec(statement).all()
+
+        next_cursor = None
+        if len(worklogs) > limit:
+            worklogs = worklogs[:limit]
+            last = worklogs[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+        return WorkLogPageOut(
+            data=[
+                WorklogService._to_worklog_out(worklog, include_segments)
+                for worklog in worklogs
+            ],
+            next_cursor=next_cursor,
+        )
+
+    @staticmethod
+    def _check_overlaps(
+        session: Session,
+        user_id: uuid.UUID,
+        intervals: list[tuple[datetime, datetime]],
+        exclude_ids: list[uuid.UUID] | None = None,
+    ) -> None:
+        """
+        Reject time segments that overlap each other or one the user already
+        logged. The user's segment writes are serialized by a transaction
+        advisory lock, so two requests cannot both pass the check.
+        """
+        if not intervals:
+            return
+        WorklogService._check_interval_batch(intervals)
+        session.exec(WorklogService._segment_lock(user_id))
+        overlap = session.exec(
+            WorklogService._overlap_query(user_id, intervals, exclude_ids or [])
+        ).first()
+        if overlap is not None:
+            raise WorklogService._overlap_error(overlap)
+
+    @staticmethod
+    def _segment_lock(user_id: uuid.UUID):  # type: ignore[no-untyped-def]
+        # advisory lock keys are signed bigints; take the uuid's low 63 bits
+        return select(func.pg_advisory_xact_lock(user_id.int & (2**63 - 1)))
+
+    @staticmethod
+    def _overlap_query(  # type: ignore[no-untyped-def]
+        user_id: uuid.UUID,
+        intervals: list[tuple[datetime, datetime]],
+        exclude_ids: list[uuid.UUID],
+    ):
+        """
+        Id of a stored segment overlapping one of `intervals`, if any.
+
+        Stored segments may overlap each other (older data, imports), so
+        each interval probes for any segment with `start_time < end` and
+        `end_time > start`. The `(user_id, end_time)` index bounds that to
+        the segments ending after the interval starts, a handful for new
+        work whatever the user's history.
+        """
+        candidate = values(
+            column("start_time", DateTime),
+            column("end_time", DateTime),
+            name="candidate",
+        ).data(intervals)
+        overlapping = (
+            select(TimeSegment.id)
+            .where(
+                TimeSegment.user_id == user_id,
+                TimeSegment.start_time < candidate.c.end_time,
+                TimeSegment.end_time > candidate.c.start_time,
+                col(TimeSegment.id).not_in(exclude_ids),
+            )
+            .limit(1)
+            .lateral()
+        )
+        return (
+            select(overlapping.c.id)
+            .select_from(candidate.join(overlapping, true()))
+            .limit(1)
+        )
+
+    @staticmethod
+    def _check_interval_batch(intervals: list[tuple[datetime, datetime]]) -> None:
+        """Reject a request whose own segments overlap each other."""
+        ordered = sorted((naive_utc(start), naive_utc(end)) for start, end in intervals)
+        for (_, previous_end), (start, _) in zip(ordered, ordered[1:]):
+            if start < previous_end:
+                raise HTTPException(
+                    status_code=409, detail="The time segments overlap each other."
+                )
+
+    @staticmethod
+    def _overlap_error(time_segment_id: uuid.UUID) -> HTTPException:
+        return HTTPException(
+            status_code=409,
+            detail=f"The time segment overlaps the time segment {time_segment_id}.",
+        )
+
+    @staticmethod
+    def _apply_segment_deltas(
+        session: Session, deltas: dict[uuid.UUID, tuple[float, int]]
+    ) -> None:
+        """
+        Shift the stored totals of worklogs by `(minutes, segments)` changes,
+        in the caller's transaction and one `UPDATE ... FROM (VALUES ...)`
+        however many worklogs are touched. The increments happen in SQL, so
+        concurrent writers to the same worklog cannot lose each other's update.
+        """
+        if not deltas:
+            return
+        delta = values(
+            column("worklog_id", Uuid),
+            column("minutes", Float),
+            column("segments", Integer),
+            name="delta",
+        ).data([(worklog_id, *change) for worklog_id, change in deltas.items()])
+        session.exec(  # type: ignore[call-overload]
+            update(WorkLog)
+            .where(col(WorkLog.id) == delta.c.worklog_id)
+            .values(
+                total_duration_minutes=WorkLog.total_duration_minutes + delta.c.minutes,
+                segment_count=WorkLog.segment_count + delta.c.segments,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def _segment_minutes(start_time: datetime, end_time: datetime) -> float:
+        return (end_time - start_time).total_seconds() / 60
+
+    @staticmethod
+    def _to_worklog_out(worklog: WorkLog, include_segments: bool = True) -> WorkLogOut:
+        if not include_segments:
+            return WorkLogOut(
                 id=worklog.id,
                 user_id=worklog.user_id,
                 task_id=worklog.task_id,
                 created_at=worklog.created_at,
-                updated_at=worklog.updated_at,
                 total_duration_minutes=worklog.total_duration_minutes,
-                segment_count=len(worklog.time_segments),
-                time_segments=[
-                    TimeSegmentOut(
-                        id=ts.id,
-                        worklog_id=ts.worklog_id,
-                        user_id=ts.user_id,
-                        start_time=ts.start_time,
-                        end_time=ts.end_time,
-                        description=ts.description,
-                        notes=ts.notes,
-                        recorded_at=ts.recorded_at,
-                    )
-                    for ts in worklog.time_segments
-                ],
-            )
-            for worklog in worklogs
-        ]
+                segment_count=worklog.segment_count,
+            )
+        return WorkLogOut(
+            id=worklog.id,
+            user_id=worklog.user_id,
+            task_id=worklog.task_id,
+            created_at=worklog.created_at,
+            total_duration_minutes=worklog.total_duration_minutes,
+            segment_count=worklog.segment_count,
+            time_segments=[
+                WorklogService._to_time_segment_out(ts)
+                for ts in worklog.time_segments
+            ],
+        )
+
+    @staticmethod
+    def _to_time_segment_out(ts: TimeSegment) -> TimeSegmentOut:
+        return TimeSegmentOut(
+            id=ts.id,
+            worklog_id=ts.worklog_id,
+            user_id=ts.user_id,
+            start_time=ts.start_time,
+            end_time=ts.end_time,
+            description=ts.description,
+            notes=ts.notes,
+            recorded_at=ts.recorded_at,
+        )
 
     # a time segment can be questioned, removed, or adjusted.
 
     def get_all_user_time_segments(
-        session: Session, current_user: CurrentUser
-    ) -> list[TimeSegmentOut]:
-        """gets all the user time segments"""
+        session: Session,
+        current_user: CurrentUser,
+        start_from: datetime | None = None,
+        start_to: datetime | None = None,
+        limit: int = 100,
+        cursor: str | None = None,
+    ) -> TimeSegmentPageOut:
+        """
+        gets one page of the user time segments, ordered by `(start_time, id)`,
+        optionally only those starting within `[start_from, start_to)`.
+        Each page is a range scan of `ix_timesegment_user_id_start_time`.
+        """
+        statement = select(TimeSegment).where(TimeSegment.user_id == current_user.id)
+        if start_from is not None:
+            statement = statement.where(TimeSegment.start_time >= start_from)
+        if start_to is not None:
+            statement = statement.where(TimeSegment.start_time < start_to)
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                raise HTTPException(status_code=400, detail="Invalid cursor.")
+            statement = statement.where(
+                tuple_(TimeSegment.start_time, TimeSegment.id) > position
+            )
+        # fetch one extra row to know whether another page follows
         time_segments = session.exec(
-            select(TimeSegment).where(TimeSegment.user_id == current_user.id)
+            statement.order_by(TimeSegment.start_time, TimeSegment.id).limit(limit + 1)
         ).all()
-        return [
-            TimeSegmentOut(
-                id=ts.id,
-                worklog_id=ts.worklog_id,
-                user_id=ts.user_id,
-                start_time=ts.start_time,
-                end_time=ts.end_time,
-                duration_minutes=ts.duration_minutes,
-                duration=ts.duration,
-                description=ts.description,
-                notes=ts.notes,
-                recorded_at=ts.recorded_at,
-            )
-            for ts in time_segments
-        ]
+
+        next_cursor = None
+        if len(time_segments) > limit:
+            time_segments = time_segments[:limit]
+            last = time_segments[-1]
+            next_cursor = encode_cursor(last.start_time, last.id)
+
+        return TimeSegmentPageOut(
+            data=[WorklogService._to_time_segment_out(ts) for ts in time_segments],
+            next_cursor=next_cursor,
+        )
+
+    @staticmethod
+    def _get_time_segment(
+        session: Session, time_segment_id: uuid.UUID, for_update: bool = False
+    ) -> TimeSegment | None:
+        # the primary key is (id, start_time), the partition key; by id alone
+        # it is one probe of each partition's primary key index
+        statement = select(TimeSegment).where(TimeSegment.id == time_segment_id)
+        if for_update:
+            # a payout run stamping the segment waits, or is waited for
+            statement = statement.with_for_update()
+        return session.exec(statement).first()
+
+    @staticmethod
+    def _check_not_remitted(session: Session, remitted: list[uuid.UUID]) -> None:
+        """409 (undoing the batch) if any of the segments has been paid out."""
+        if remitted:
+            session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail=(
+                    "Time segments already remitted cannot be changed: "
+                    f"{', '.join(sorted(map(str, remitted)))}."
+                ),
+            )
 
     def delete_time_segment(
         session: Session, current_user: CurrentUser, time_segment_id: uuid.UUID
     ) -> DeleteTimeSegmentOut:
         # Fetch the time segment
-        time_segment = session.get(TimeSegment, time_segment_id)
+        time_segment = WorklogService._get_time_segment(
+            session, time_segment_id, for_update=True
+        )
 
         if not time_segment:
             raise HTTPException(
@@ -138,9 +771,19 @@ class WorklogService:
             raise HTTPException(
                 status_code=403, detail="Not allowed to remove this time segment."
             )
+        if time_segment.remittance_id is not None:
+            WorklogService._check_not_remitted(session, [time_segment.id])
 
-        # Delete and commit
+        # Delete, leaving a tombstone for the change feed, take the segment
+        # off its worklog's totals and commit it all at once
         session.delete(time_segment)
+        session.add(Tombstone(entity="time_segment", entity_id=time_segment.id))
+        minutes = WorklogService._segment_minutes(
+            time_segment.start_time, time_segment.end_time
+        )
+        WorklogService._apply_segment_deltas(
+            session, {time_segment.worklog_id: (-minutes, -1)}
+        )
         session.commit()
 
         # Return confirmation
@@ -153,7 +796,9 @@ class WorklogService:
         update_time_segment_data: UpdateTimeSegmentIn,
     ) -> UpdateTimeSegmentOut:
         # get segment from DB
-        time_segment = session.get(TimeSegment, time_segment_id)
+        time_segment = WorklogService._get_time_segment(
+            session, time_segment_id, for_update=True
+        )
         if not time_segment:
             raise HTTPException(
                 status_code=404,
@@ -164,11 +809,403 @@ class WorklogService:
             raise HTTPException(
                 status_code=403, detail="Not allowed to update this time segment."
             )
+        if time_segment.remittance_id is not None:
+            WorklogService._check_not_remitted(session, [time_segment.id])
 
+        WorklogService._check_overlaps(
+            session,
+            time_segment.user_id,
+            [(update_time_segment_data.start_time, update_time_segment_data.end_time)],
+            exclude_ids=[time_segment.id],
+        )
+        old_minutes = WorklogService._segment_minutes(
+            time_segment.start_time, time_segment.end_time
+        )
         update_data = update_time_segment_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(time_segment, field, value)
 
+        # carry the change of duration over to the worklog total
+        minutes = (
+            WorklogService._segment_minutes(time_segment.start_time, time_segment.end_time)
+            - old_minutes
+        )
+        if minutes:
+            WorklogService._apply_segment_deltas(
+                session, {time_segment.worklog_id: (minutes, 0)}
+            )
         session.commit()
         session.refresh(time_segment)
         return UpdateTimeSegmentOut(description="Your data has been updated.")
+
+    @staticmethod
+    def delete_time_segments(
+        session: Session, current_user: CurrentUser, time_segment_ids: list[uuid.UUID]
+    ) -> TimeSegmentBatchOut:
+        """
+        Delete many of the user's time segments at once. The DELETE itself
+        checks ownership (`id IN (...) AND user_id = :me`) and returns what
+        it removed, which is all that is needed for the tombstones and the
+        worklog totals. Remitted segments make the whole batch fail.
+        """
+        ids = set(time_segment_ids)
+        deleted = session.exec(  # type: ignore[call-overload]
+            delete(TimeSegment)
+            .where(col(TimeSegment.id).in_(ids), TimeSegment.user_id == current_user.id)
+            .returning(
+                TimeSegment.id,
+                TimeSegment.worklog_id,
+                TimeSegment.start_time,
+                TimeSegment.end_time,
+                TimeSegment.remittance_id,
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        WorklogService._check_all_found(session, ids, {row.id for row in deleted})
+        WorklogService._check_not_remitted(
+            session, [row.id for row in deleted if row.remittance_id is not None]
+        )
+
+        deltas: dict[uuid.UUID, tuple[float, int]] = {}
+        for row in deleted:
+            minutes, segments = deltas.get(row.worklog_id, (0.0, 0))
+            deltas[row.worklog_id] = (
+                minutes - WorklogService._segment_minutes(row.start_time, row.end_time),
+                segments - 1,
+            )
+        session.exec(  # type: ignore[call-overload]
+            insert(Tombstone),
+            params=[
+                {
+                    "id": uuid.uuid4(),
+                    "entity": "time_segment",
+                    "entity_id": row.id,
+                }
+                for row in deleted
+            ],
+        )
+        WorklogService._apply_segment_deltas(session, deltas)
+        session.commit()
+        return TimeSegmentBatchOut(count=len(deleted))
+
+    @staticmethod
+    def update_time_segments(
+        session: Session,
+        current_user: CurrentUser,
+        patches_in: TimeSegmentBatchUpdateIn,
+    ) -> TimeSegmentBatchOut:
+        """
+        Apply many time segment patches at once: one ownership query that
+        also locks the rows, one overlap check and a single
+        `UPDATE ... FROM (VALUES ...)` for the segments, plus one for the
+        worklog totals. Remitted segments make the whole batch fail.
+        """
+        patches = {patch.id: patch for patch in patches_in.time_segments}
+        if len(patches) != len(patches_in.time_segments):
+            raise HTTPException(
+                status_code=400, detail="Each time segment may only be patched once."
+            )
+        # same lock order as the overlap check of the single-row writes
+        session.exec(WorklogService._segment_lock(current_user.id))
+        current = session.exec(
+            select(
+                TimeSegment.id,
+                TimeSegment.worklog_id,
+                TimeSegment.start_time,
+                TimeSegment.end_time,
+                TimeSegment.remittance_id,
+            )
+            .where(
+                col(TimeSegment.id).in_(patches), TimeSegment.user_id == current_user.id
+            )
+            .with_for_update()
+        ).all()
+        WorklogService._check_all_found(session, set(patches), {row.id for row in current})
+        WorklogService._check_not_remitted(
+            session, [row.id for row in current if row.remittance_id is not None]
+        )
+        WorklogService._check_overlaps(
+            session,
+            current_user.id,
+            [(patch.start_time, patch.end_time) for patch in patches.values()],
+            exclude_ids=list(patches),
+        )
+
+        patch = values(
+            column("id", Uuid),
+            column("start_time", DateTime),
+            column("end_time", DateTime),
+            column("description", String),
+            column("notes", String),
+            name="patch",
+        ).data(
+            [
+                (p.id, p.start_time, p.end_time, p.description, p.notes)
+                for p in patches.values()
+            ]
+        )
+        session.exec(  # type: ignore[call-overload]
+            update(TimeSegment)
+            .where(col(TimeSegment.id) == patch.c.id)
+            .values(
+                start_time=patch.c.start_time,
+                end_time=patch.c.end_time,
+                description=patch.c.description,
+                notes=patch.c.notes,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        # carry the changes of duration over to the worklog totals
+        deltas: dict[uuid.UUID, tuple[float, int]] = {}
+        for row in current:
+            new = patches[row.id]
+            minutes = WorklogService._segment_minutes(
+                new.start_time, new.end_time
+            ) - WorklogService._segment_minutes(row.start_time, row.end_time)
+            if minutes:
+                deltas[row.worklog_id] = (deltas.get(row.worklog_id, (0.0, 0))[0] + minutes, 0)
+        WorklogService._apply_segment_deltas(session, deltas)
+        session.commit()
+        return TimeSegmentBatchOut(count=len(current))
+
+    @staticmethod
+    def _check_all_found(
+        session: Session, requested: set[uuid.UUID], found: set[uuid.UUID]
+    ) -> None:
+        """404 (undoing the batch) unless every id is one of the user's segments."""
+        missing = requested - found
+        if missing:
+            session.rollback()
+            raise HTTPException(
+                status_code=404,
+                detail=(
+                    "No time segments with the ids "
+                    f"{', '.join(sorted(map(str, missing)))} found."
+                ),
+            )
+
+
+class AsyncWorklogService:
+    """
+    Async counterpart of `WorklogService` for the hot write path: a request
+    waiting on the database gives the event loop back instead of holding one
+    of the threadpool's workers.
+    """
+
+    @staticmethod
+    async def create_worklog(
+        session: AsyncSession,
+        worklog_in: WorkLogCreateIn,
+        current_user: AsyncCurrentUser,
+        commit: bool = True,
+    ) -> WorkLogOut:
+        """
+        Create new worklog. Ids and timestamps are generated in Python, so the
+        response is built from the objects just written instead of being
+        read back with a refresh. With `commit=False` it is only flushed.
+        """
+        task = (
+            await session.exec(select(Task.id).where(Task.id == worklog_in.task_id))
+        ).first()
+        if not task:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No task with the id {worklog_in.task_id} found.",
+            )
+        intervals = [(ts.start_time, ts.end_time) for ts in worklog_in.time_segments]
+        if intervals:
+            WorklogService._check_interval_batch(intervals)
+            await session.exec(WorklogService._segment_lock(current_user.id))
+            overlap = (
+                await session.exec(
+                    WorklogService._overlap_query(current_user.id, intervals, [])
+                )
+            ).first()
+            if overlap is not None:
+                raise WorklogService._overlap_error(overlap)
+        worklog = WorklogService._build_worklog(worklog_in, current_user)
+
+        session.add(worklog)
+        if commit:
+            await session.commit()
+        else:
+            await session.flush()
+        return WorklogService._to_worklog_out(worklog)
+
+
+class IdempotencyService:
+    """
+    `Idempotency-Key` support for the create endpoints. The first request
+    with a key reserves it, runs and stores its response; a retry with the
+    same key gets that response back from one primary-key lookup instead of
+    creating a duplicate.
+
+    The reservation, the create (run with `commit=False`) and the stored
+    response share one transaction, so a failure or crash anywhere in
+    between rolls back all three instead of leaving the key reserved with
+    no response. A concurrent request with the same key waits on the
+    reserved row and then replays the committed response.
+    """
+
+    @staticmethod
+    def fingerprint(path: str, body: str) -> str:
+        return hashlib.sha256(f"{path}\n{body}".encode()).hexdigest()
+
+    @staticmethod
+    def run(
+        session: Session,
+        user_id: uuid.UUID,
+        key: str,
+        request_hash: str,
+        status_code: int,
+        create: Callable[[], object],
+    ) -> object:
+        record = session.exec(IdempotencyService._lookup(user_id, key)).first()
+        replay = IdempotencyService._replay(record, request_hash)
+        if replay is not None:
+            return replay
+
+        try:
+            reserved = session.exec(  # type: ignore[call-overload]
+                IdempotencyService._reserve(user_id, key, request_hash)
+            ).rowcount
+            if not reserved:
+                # a concurrent request with the same key got there first
+                session.rollback()
+                record = session.exec(IdempotencyService._lookup(user_id, key)).first()
+                return IdempotencyService._replay(record, request_hash) or (
+                    IdempotencyService._in_progress()
+                )
+            session.exec(IdempotencyService._purge_expired())  # type: ignore[call-overload]
+            content = jsonable_encoder(create())
+            session.exec(  # type: ignore[call-overload]
+                IdempotencyService._store(user_id, key, status_code, content)
+            )
+            session.commit()
+        except Exception:
+            # drops the reservation too, so a corrected retry is not stuck
+            session.rollback()
+            raise
+        return content
+
+    @staticmethod
+    def _lookup(user_id: uuid.UUID, key: str):  # type: ignore[no-untyped-def]
+        return select(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > datetime.now(timezone.utc),
+        )
+
+    @staticmethod
+    def _reserve(user_id: uuid.UUID, key: str, request_hash: str):  # type: ignore[no-untyped-def]
+        """
+        Claim the key, taking over an expired row with the same key. Affects
+        no row while another live request holds it, without raising.
+        """
+        now = datetime.now(timezone.utc)
+        statement = pg_insert(IdempotencyKey).values(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            created_at=now,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+        )
+        return statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+            set_={
+                "request_hash": statement.excluded.request_hash,
+                "status_code": None,
+                "response": None,
+                "created_at": statement.excluded.created_at,
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=col(IdempotencyKey.expires_at) <= now,
+        )
+
+    @staticmethod
+    def _purge_expired(batch_size: int = 100):  # type: ignore[no-untyped-def]
+        """Evict a bounded batch of expired keys, amortized over new reservations."""
+        expired = (
+            select(IdempotencyKey.user_id, IdempotencyKey.key)
+            .where(col(IdempotencyKey.expires_at) <= datetime.now(timezone.utc))
+            .limit(batch_size)
+        )
+        return delete(IdempotencyKey).where(
+            tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired)
+        )
+
+    @staticmethod
+    def _store(user_id: uuid.UUID, key: str, status_code: int, content: object):  # type: ignore[no-untyped-def]
+        return (
+            update(IdempotencyKey)
+            .where(col(IdempotencyKey.user_id) == user_id, col(IdempotencyKey.key) == key)
+            .values(status_code=status_code, response=json.dumps(content))
+        )
+
+    @staticmethod
+    def _replay(record: IdempotencyKey | None, request_hash: str) -> JSONResponse | None:
+        if record is None:
+            return None
+        if record.request_hash != request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for a different request.",
+            )
+        if record.status_code is None:
+            IdempotencyService._in_progress()
+        return JSONResponse(
+            content=json.loads(record.response or "null"),
+            status_code=record.status_code,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    @staticmethod
+    def _in_progress() -> NoReturn:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed.",
+        )
+
+
+class AsyncIdempotencyService:
+    """`IdempotencyService` for the async routes, running the same statements."""
+
+    @staticmethod
+    async def run(
+        session: AsyncSession,
+        user_id: uuid.UUID,
+        key: str,
+        request_hash: str,
+        status_code: int,
+        create: Callable[[], Awaitable[object]],
+    ) -> object:
+        record = (await session.exec(IdempotencyService._lookup(user_id, key))).first()
+        replay = IdempotencyService._replay(record, request_hash)
+        if replay is not None:
+            return replay
+
+        try:
+            reserved = (
+                await session.exec(  # type: ignore[call-overload]
+                    IdempotencyService._reserve(user_id, key, request_hash)
+                )
+            ).rowcount
+            if not reserved:
+                await session.rollback()
+                record = (
+                    await session.exec(IdempotencyService._lookup(user_id, key))
+                ).first()
+                return IdempotencyService._replay(record, request_hash) or (
+                    IdempotencyService._in_progress()
+                )
+            await session.exec(IdempotencyService._purge_expired())  # type: ignore[call-overload]
+            content = jsonable_encoder(await create())
+            await session.exec(  # type: ignore[call-overload]
+                IdempotencyService._store(user_id, key, status_code, content)
+            )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        return content
@@ -0,0 +1,291 @@
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlmodel import Session, col, select
+
+from app.api.deps import CurrentUser
+from app.core.config import settings
+from app.core.db import engine
+from app.models import TimeSegment, WorkLog
+from app.schemas import TimerOut, TimerStartIn
+
+from .service import WorklogService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BufferedTimer:
+    """A live timer segment that only exists in memory until it is flushed."""
+    user_id: uuid.UUID
+    worklog_id: uuid.UUID
+    start_time: datetime
+    description: str | None = None
+    notes: str | None = None
+    end_time: datetime | None = None
+
+
+class TimerBuffer:
+    """
+    Running timers per user plus the stopped segments waiting to be written.
+
+    Lives in the process, so the timer routes need every request of a user
+    to reach the same process, and timers still running when the process
+    dies are lost. Stopped segments are flushed on shutdown.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._running: dict[uuid.UUID, BufferedTimer] = {}
+        self._stopped: list[BufferedTimer] = []
+        self.flush_requested = threading.Event()
+
+    def start(self, timer: BufferedTimer) -> BufferedTimer | None:
+        """
+        Start `timer`, or return the timer that is already running. A stopped
+        segment of the same worklog still in the buffer and ended less than
+        TIMER_MERGE_GAP_SECONDS ago is continued instead, so start/stop
+        heartbeats collapse into one row.
+        """
+        gap = timedelta(seconds=settings.TIMER_MERGE_GAP_SECONDS)
+        with self._lock:
+            running = self._running.get(timer.user_id)
+            if running is not None:
+                return running
+            for index in range(len(self._stopped) - 1, -1, -1):
+                stopped = self._stopped[index]
+                if stopped.user_id != timer.user_id:
+                    continue
+                if (
+                    stopped.worklog_id == timer.worklog_id
+                    and stopped.end_time is not None
+                    and timer.start_time - stopped.end_time <= gap
+                ):
+                    del self._stopped[index]
+                    timer.start_time = stopped.start_time
+                break
+            self._running[timer.user_id] = timer
+        return None
+
+    def stop(self, user_id: uuid.UUID, end_time: datetime) -> BufferedTimer | None:
+        with self._lock:
+            timer = self._running.pop(user_id, None)
+            if timer is None:
+                return None
+            timer.end_time = end_time
+            self._stopped.append(timer)
+            pending = len(self._stopped)
+        if pending >= settings.TIMER_FLUSH_MAX_PENDING:
+            self.flush_requested.set()
+        return timer
+
+    def cancel(self, user_id: uuid.UUID) -> None:
+        with self._lock:
+            self._running.pop(user_id, None)
+
+    def running(self, user_id: uuid.UUID) -> BufferedTimer | None:
+        with self._lock:
+            return self._running.get(user_id)
+
+    def drain(self) -> list[BufferedTimer]:
+        with self._lock:
+            stopped, self._stopped = self._stopped, []
+        return stopped
+
+    def requeue(self, timers: list[BufferedTimer]) -> None:
+        with self._lock:
+            self._stopped[:0] = timers
+
+
+timer_buffer = TimerBuffer()
+
+
+def flush_timers(buffer: TimerBuffer = timer_buffer) -> int:
+    """
+    Write every stopped timer segment in one transaction: one multi-row
+    INSERT for the segments and one UPDATE for the worklog totals. Segments
+    whose worklog has been deleted meanwhile, or that overlap a segment
+    logged since they were stopped, are dropped; on any other error the
+    batch goes back into the buffer for the next flush.
+    """
+    timers = buffer.drain()
+    if not timers:
+        return 0
+    try:
+        with Session(engine) as session:
+            existing = set(
+                session.exec(
+                    select(WorkLog.id).where(
+                        col(WorkLog.id).in_({timer.worklog_id for timer in timers})
+                    )
+                ).all()
+            )
+            timers = [timer for timer in timers if timer.worklog_id in existing]
+            timers = _drop_overlapping(session, timers)
+            if not timers:
+                return 0
+
+            now = datetime.now(timezone.utc)
+            deltas: dict[uuid.UUID, tuple[float, int]] = {}
+            for timer in timers:
+                assert timer.end_time is not None
+                minutes, segments = deltas.get(timer.worklog_id, (0.0, 0))
+                deltas[timer.worklog_id] = (
+                    minutes
+                    + WorklogService._segment_minutes(timer.start_time, timer.end_time),
+                    segments + 1,
+                )
+            session.exec(  # type: ignore[call-overload]
+                insert(TimeSegment),
+                params=[
+                    {
+                        "id": uuid.uuid4(),
+                        "worklog_id": timer.worklog_id,
+                        "user_id": timer.user_id,
+                        "start_time": timer.start_time,
+                        "end_time": timer.end_time,
+                        "description": timer.description,
+                        "notes": timer.notes,
+                        "recorded_at": now,
+                        "created_at": now,
+                    }
+                    for timer in timers
+                ],
+            )
+            WorklogService._apply_segment_deltas(session, deltas)
+            session.commit()
+    except Exception:
+        logger.exception("Flushing %d timer segments failed, retrying later", len(timers))
+        buffer.requeue(timers)
+        return 0
+    return len(timers)
+
+
+def _drop_overlapping(
+    session: Session, timers: list[BufferedTimer]
+) -> list[BufferedTimer]:
+    """
+    Check the buffered segments again under their users' segment locks,
+    held until the flush commits: other writers never see the buffer, so a
+    segment logged between stop and flush may overlap one of them.
+    """
+    # one lock order for all flushes
+    for user_id in sorted({timer.user_id for timer in timers}):
+        session.exec(WorklogService._segment_lock(user_id))
+    kept = []
+    for timer in timers:
+        assert timer.end_time is not None
+        overlap = session.exec(
+            WorklogService._overlap_query(
+                timer.user_id, [(timer.start_time, timer.end_time)], []
+            )
+        ).first()
+        if overlap is not None:
+            logger.warning(
+                "Dropping the timer segment %s - %s of worklog %s: it overlaps "
+                "the time segment %s",
+                timer.start_time, timer.end_time, timer.worklog_id, overlap,
+            )
+            continue
+        kept.append(timer)
+    return kept
+
+
+class TimerService:
+    @staticmethod
+    def start_timer(
+        session: Session, current_user: CurrentUser, timer_in: TimerStartIn
+    ) -> TimerOut:
+        """
+        Start the user's live timer on one of their worklogs. Nothing is
+        written until the timer is stopped and the buffer flushed.
+        """
+        worklog = session.exec(
+            select(WorkLog.id).where(
+                WorkLog.id == timer_in.worklog_id, WorkLog.user_id == current_user.id
+            )
+        ).first()
+        if not worklog:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No worklog with the id {timer_in.worklog_id} found.",
+            )
+        timer = BufferedTimer(
+            user_id=current_user.id,
+            worklog_id=timer_in.worklog_id,
+            start_time=datetime.now(timezone.utc),
+            description=timer_in.description,
+            notes=timer_in.notes,
+        )
+        running = timer_buffer.start(timer)
+        if running is not None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"A timer is already running on the worklog {running.worklog_id}.",
+            )
+        return TimerService._to_timer_out(timer)
+
+    @staticmethod
+    def stop_timer(session: Session, current_user: CurrentUser) -> TimerOut:
+        """
+        Stop the user's live timer. The segment is queued for the next flush;
+        one that overlaps a segment logged meanwhile is dropped with a 409.
+        """
+        running = timer_buffer.running(current_user.id)
+        if running is None:
+            raise HTTPException(status_code=404, detail="No timer is running.")
+        end_time = datetime.now(timezone.utc)
+        overlap = session.exec(
+            WorklogService._overlap_query(
+                current_user.id, [(running.start_time, end_time)], []
+            )
+        ).first()
+        if overlap is not None:
+            timer_buffer.cancel(current_user.id)
+            raise WorklogService._overlap_error(overlap)
+        timer = timer_buffer.stop(current_user.id, end_time)
+        if timer is None:
+            raise HTTPException(status_code=404, detail="No timer is running.")
+        return TimerService._to_timer_out(timer)
+
+    @staticmethod
+    def get_timer(current_user: CurrentUser) -> TimerOut | None:
+        timer = timer_buffer.running(current_user.id)
+        return TimerService._to_timer_out(timer) if timer else None
+
+    @staticmethod
+    def _to_timer_out(timer: BufferedTimer) -> TimerOut:
+        return TimerOut(
+            worklog_id=timer.worklog_id,
+            start_time=timer.start_time,
+            end_time=timer.end_time,
+            description=timer.description,
+            notes=timer.notes,
+        )
+
+
+class TimerFlusher(threading.Thread):
+    """Background thread flushing the timer buffer periodically."""
+
+    def __init__(self, buffer: TimerBuffer = timer_buffer) -> None:
+        super().__init__(name="timer-flusher", daemon=True)
+        self._buffer = buffer
+        self._stopping = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopping.is_set():
+            self._buffer.flush_requested.wait(settings.TIMER_FLUSH_INTERVAL_SECONDS)
+            self._buffer.flush_requested.clear()
+            flush_timers(self._buffer)
+
+    def stop(self) -> None:
+        """Stop the thread and write what is left in the buffer."""
+        self._stopping.set()
+        self._buffer.flush_requested.set()
+        self.join()
+        flush_timers(self._buffer)
@@ -1,10 +1,25 @@
-from typing import List
+from datetime import datetime
+from typing import Annotated, Any
 import uuid
-from fastapi import APIRouter, status
-from app.schemas import RemittanceStatusSchemaIn, TimeSegmentOut, UpdateTimeSegmentIn, UpdateTimeSegmentOut, WorkLogCreateIn, WorkLogOut
-from .service import WorklogService
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.schemas import ChangeFeedOut, RemittanceStatusSchemaIn, TimeSegmentBatchDeleteIn, TimeSegmentBatchOut, TimeSegmentBatchUpdateIn, TimeSegmentPageOut, TimerOut, TimerStartIn, UpdateTimeSegmentIn, UpdateTimeSegmentOut, WorkLogBulkCreateIn, WorkLogBulkCreateOut, WorkLogCreateIn, WorkLogPageOut, WorkLogOut, WorkLogSummaryGroupByIn, WorkLogSummaryOut
+from app.utils import etag_matches, make_etag
+from .service import (
+    AsyncIdempotencyService,
+    AsyncWorklogService,
+    IdempotencyService,
+    WorklogService,
+)
+from .timer import TimerService
 from fastapi import APIRouter
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncSessionDep,
+    CurrentUser,
+    SessionDep,
+    get_current_active_superuser,
+)
 from fastapi import status
 
 
@@ -16,41 +31,238 @@ router = APIRouter(prefix="/assessment_task", tags=["worklogs"])
     status_code=status.HTTP_201_CREATED,
 )
 def create_wroklog_for_user(
-    worklog_in: WorkLogCreateIn, session: SessionDep, current_user: CurrentUser
+    request: Request,
+    worklog_in: WorkLogCreateIn,
+    session: SessionDep,
+    current_user: CurrentUser,
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None,
 ):
     """
     Create a new worklog.
+    - `Idempotency-Key`: retries sending the same key get the first response back.
     """
-    return WorklogService.create_worklog(
-        session=session, worklog_in=worklog_in, current_user=current_user
+    def create(commit: bool = True) -> Any:
+        return WorklogService.create_worklog(
+            session=session,
+            worklog_in=worklog_in,
+            current_user=current_user,
+            commit=commit,
+        )
+
+    if idempotency_key is None:
+        return create()
+    return IdempotencyService.run(
+        session,
+        current_user.id,
+        idempotency_key,
+        IdempotencyService.fingerprint(request.url.path, worklog_in.model_dump_json()),
+        status.HTTP_201_CREATED,
+        lambda: create(commit=False),
+    )
+
+
+@router.post(
+    "/create-worklog-async",
+    status_code=status.HTTP_201_CREATED,
+    response_model=WorkLogOut,
+)
+async def create_worklog_async(
+    request: Request,
+    worklog_in: WorkLogCreateIn,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None,
+) -> Any:
+    """
+    Create a new worklog without tying up a worker thread while the
+    database works.
+    - `Idempotency-Key`: retries sending the same key get the first response back.
+    """
+    async def create(commit: bool = True) -> WorkLogOut:
+        return await AsyncWorklogService.create_worklog(
+            session=session,
+            worklog_in=worklog_in,
+            current_user=current_user,
+            commit=commit,
+        )
+
+    if idempotency_key is None:
+        return await create()
+    return await AsyncIdempotencyService.run(
+        session,
+        current_user.id,
+        idempotency_key,
+        IdempotencyService.fingerprint(request.url.path, worklog_in.model_dump_json()),
+        status.HTTP_201_CREATED,
+        lambda: create(commit=False),
+    )
+
+
+@router.post(
+    "/create-worklogs-bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=WorkLogBulkCreateOut,
+)
+def create_worklogs_bulk(
+    request: Request,
+    worklogs_in: WorkLogBulkCreateIn,
+    session: SessionDep,
+    current_user: CurrentUser,
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None,
+) -> Any:
+    """
+    Create many worklogs in one request and one transaction.
+    - `Idempotency-Key`: retries sending the same key get the first response back.
+    """
+    def create(commit: bool = True) -> WorkLogBulkCreateOut:
+        return WorklogService.create_worklogs_bulk(
+            session=session,
+            worklogs_in=worklogs_in,
+            current_user=current_user,
+            commit=commit,
+        )
+
+    if idempotency_key is None:
+        return create()
+    return IdempotencyService.run(
+        session,
+        current_user.id,
+        idempotency_key,
+        IdempotencyService.fingerprint(request.url.path, worklogs_in.model_dump_json()),
+        status.HTTP_201_CREATED,
+        lambda: create(commit=False),
     )
 
 
 @router.get(
-    "/list-all-worklogs", status_code=status.HTTP_200_OK, response_model=List[WorkLogOut]
+    "/list-all-worklogs",
+    status_code=status.HTTP_200_OK,
+    response_model=WorkLogPageOut,
+    responses={304: {"description": "Not modified"}},
 )
 def get_all_worklogs(
+    request: Request,
+    response: Response,
+    session: SessionDep,
+    remittance_status: RemittanceStatusSchemaIn | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: str | None = None,
+    include_segments: bool = True,
+    fields: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Any:
+    """
+    Get all worklogs, one page at a time.
+    - `include_segments`: set to false to skip loading the time segments.
+    - `fields`: comma-separated worklog fields to return, e.g. `id,user_id,segment_count`.
+
+    Send the last `ETag` back in `If-None-Match` to get a `304 Not Modified`
+    while nothing changed.
+    """
+    etag = make_etag(WorklogService.get_worklogs_version(session), request.url.query)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    selected = WorklogService.parse_worklog_fields(fields)
+    if selected is not None and "time_segments" not in selected:
+        include_segments = False
+    page = WorklogService.get_all_wroklogs(
+        session, remittance_status, limit, cursor, include_segments
+    )
+    if selected is None:
+        return page
+    return JSONResponse(
+        WorklogService.dump_worklog_fields(page, selected), headers={"ETag": etag}
+    )
+
+
+@router.get(
+    "/query-worklogs", status_code=status.HTTP_200_OK, response_model=WorkLogPageOut
+)
+def query_worklogs(
+    session: SessionDep,
+    user_id: uuid.UUID | None = None,
+    task_id: uuid.UUID | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: str | None = None,
+    include_segments: bool = True,
+) -> WorkLogPageOut:
+    """
+    Get the worklogs of a user and/or task, optionally within `[created_from, created_to)`.
+    """
+    return WorklogService.query_worklogs(
+        session, user_id, task_id, created_from, created_to, limit, cursor,
+        include_segments,
+    )
+
+
+@router.get("/changes", status_code=status.HTTP_200_OK, response_model=ChangeFeedOut)
+def get_changes(
     session: SessionDep,
-    remittance_status: RemittanceStatusSchemaIn
-) -> list[WorkLogOut]:
+    since: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=5000)] = 500,
+) -> ChangeFeedOut:
     """
-    Get all worklogs.
+    Get the worklog and time segment changes (including deletes) after `since`.
+    Omit `since` for a full initial sync.
     """
-    return WorklogService.get_all_wroklogs(session, remittance_status)
+    return WorklogService.get_changes(session, since, limit)
+
+
+@router.get(
+    "/worklogs/summary", status_code=status.HTTP_200_OK, response_model=WorkLogSummaryOut
+)
+def get_worklogs_summary(
+    session: SessionDep,
+    group_by: WorkLogSummaryGroupByIn,
+    start_from: Annotated[datetime | None, Query(alias="from")] = None,
+    start_to: Annotated[datetime | None, Query(alias="to")] = None,
+) -> WorkLogSummaryOut:
+    """
+    Get worked minutes, worklog and segment counts per user, task or day.
+    - `from` / `to`: only segments starting within `[from, to)`.
+    """
+    return WorklogService.get_worklogs_summary(session, group_by, start_from, start_to)
+
+
+@router.get(
+    "/export-worklogs",
+    dependencies=[Depends(get_current_active_superuser)],
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+def export_worklogs() -> StreamingResponse:
+    """
+    Stream all worklogs, with their time segments, as NDJSON (one worklog per line).
+    """
+    return StreamingResponse(
+        WorklogService.stream_worklogs(), media_type="application/x-ndjson"
+    )
 
 
 @router.get(
     "/get-all-user-time-segments",
     status_code=status.HTTP_200_OK,
-    response_model=List[TimeSegmentOut],
+    response_model=TimeSegmentPageOut,
 )
 def get_all_user_time_segments(
-    session: SessionDep, current_user: CurrentUser
-) -> list[TimeSegmentOut]:
+    session: SessionDep,
+    current_user: CurrentUser,
+    start_from: Annotated[datetime | None, Query(alias="from")] = None,
+    start_to: Annotated[datetime | None, Query(alias="to")] = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: str | None = None,
+) -> TimeSegmentPageOut:
     """
-    Get all user's time segments.
+    Get the user's time segments, one page at a time.
+    - `from` / `to`: only segments starting within `[from, to)`.
     """
-    return WorklogService.get_all_user_time_segments(session, current_user)
+    return WorklogService.get_all_user_time_segments(
+        session, current_user, start_from, start_to, limit, cursor
+    )
 
 
 @router.delete("/remove-time-segment", status_code=status.HTTP_200_OK)
@@ -78,3 +290,62 @@ def update_time_segment(
         session=session, time_segment_id=time_segment_id, current_user=current_user,
         update_time_segment_data=update_time_segment_data
     )
+
+
+@router.post("/remove-time-segments", status_code=status.HTTP_200_OK,
+             response_model=TimeSegmentBatchOut)
+def delete_time_segments(
+    time_segments_in: TimeSegmentBatchDeleteIn, session: SessionDep, current_user: CurrentUser
+) -> TimeSegmentBatchOut:
+    """
+    Delete many time segments in one request. Nothing is deleted unless all
+    of them belong to the current user.
+    """
+    return WorklogService.delete_time_segments(
+        session=session, current_user=current_user, time_segment_ids=time_segments_in.ids
+    )
+
+
+@router.patch("/update-time-segments", status_code=status.HTTP_200_OK,
+              response_model=TimeSegmentBatchOut)
+def update_time_segments(
+    patches_in: TimeSegmentBatchUpdateIn, session: SessionDep, current_user: CurrentUser
+) -> TimeSegmentBatchOut:
+    """
+    Update many time segments in one request. Nothing is changed unless all
+    of them belong to the current user.
+    """
+    return WorklogService.update_time_segments(
+        session=session, current_user=current_user, patches_in=patches_in
+    )
+
+
+@router.post("/timer/start", status_code=status.HTTP_201_CREATED,
+             response_model=TimerOut)
+def start_timer(
+    timer_in: TimerStartIn, session: SessionDep, current_user: CurrentUser
+) -> TimerOut:
+    """
+    Start a live timer on a worklog.
+    """
+    return TimerService.start_timer(
+        session=session, current_user=current_user, timer_in=timer_in
+    )
+
+
+@router.post("/timer/stop", status_code=status.HTTP_200_OK,
+             response_model=TimerOut)
+def stop_timer(session: SessionDep, current_user: CurrentUser) -> TimerOut:
+    """
+    Stop the running timer. Its time segment is saved with the next batch.
+    """
+    return TimerService.stop_timer(session=session, current_user=current_user)
+
+
+@router.get("/timer", status_code=status.HTTP_200_OK,
+            response_model=TimerOut | None)
+def get_timer(current_user: CurrentUser) -> TimerOut | None:
+    """
+    The running timer, if any.
+    """
+    return TimerService.get_timer(current_user=current_user)
@@ -68,6 +68,11 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # connections of the async engine; an in-flight async request holds one
+    # only while it is actually talking to the database
+    ASYNC_DB_POOL_SIZE: int = 20
+    ASYNC_DB_MAX_OVERFLOW: int = 20
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -84,6 +89,27 @@ class Settings(BaseSettings):
         return self
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
+    # how long a create's response is replayed for retries with the same
+    # Idempotency-Key
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    # live timer segments are buffered in memory and written in batches:
+    # every TIMER_FLUSH_INTERVAL_SECONDS, or sooner once this many are waiting
+    TIMER_FLUSH_INTERVAL_SECONDS: float = 10
+    TIMER_FLUSH_MAX_PENDING: int = 5000
+    # a timer restarted on the same worklog within this gap continues the
+    # buffered segment instead of opening a new one
+    TIMER_MERGE_GAP_SECONDS: int = 60
+    # monthly timesegment partitions kept created ahead of time
+    TIME_SEGMENT_PARTITION_MONTHS_AHEAD: int = 12
+    # payout runs are coordinated from a background thread pool; their
+    # user-id ranges of REMITTANCE_JOB_CHUNK_SIZE users are settled in
+    # REMITTANCE_JOB_PROCESSES worker processes, each committing its own range
+    REMITTANCE_JOB_WORKERS: int = 2
+    REMITTANCE_JOB_CHUNK_SIZE: int = 1000
+    REMITTANCE_JOB_PROCESSES: int = 4
+    # a RUNNING job not heard from for this long lost its process; it is
+    # marked FAILED on start and may be resumed
+    REMITTANCE_JOB_LEASE_SECONDS: int = 60
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -1,10 +1,22 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
 from app.models import User, UserCreate
 
+logger = logging.getLogger(__name__)
+
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+# same database through psycopg's async driver, for the `async def` routes
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    pool_size=settings.ASYNC_DB_POOL_SIZE,
+    max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -31,3 +43,29 @@ def init_db(session: Session) -> None:
             is_superuser=True,
         )
         user = crud.create_user(session=session, user_create=user_in)
+
+    try:
+        ensure_time_segment_partitions(session)
+    except Exception:
+        # segments beyond the partitions still land in the default partition
+        logger.exception("Creating the monthly timesegment partitions failed")
+        session.rollback()
+
+
+def ensure_time_segment_partitions(session: Session) -> int:
+    """
+    Create the monthly `timesegment` partitions from this month up to
+    TIME_SEGMENT_PARTITION_MONTHS_AHEAD months ahead, if missing. Runs on
+    every start (see `initial_data.py`), so the partitions stay ahead of the
+    data and the default partition only catches stray dates.
+    """
+    created = session.exec(  # type: ignore[call-overload]
+        text(
+            "SELECT create_timesegment_partitions("
+            "date_trunc('month', now())::date, "
+            "(now() + make_interval(months => :months))::date)"
+        ),
+        params={"months": settings.TIME_SEGMENT_PARTITION_MONTHS_AHEAD},
+    ).scalar_one()
+    session.commit()
+    return created
@@ -1,10 +1,17 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from sqlmodel import Session
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.routes.remittance.jobs import RemittanceJobService, remittance_job_runner
+from app.api.routes.worklogs.timer import TimerFlusher
 from app.core.config import settings
+from app.core.db import engine
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,10 +21,25 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # writes the live timer segments in batches, and what is left on shutdown
+    timer_flusher = TimerFlusher()
+    timer_flusher.start()
+    # payout runs whose process died mid-run become resumable
+    with Session(engine) as session:
+        RemittanceJobService.fail_stale_jobs(session)
+    yield
+    timer_flusher.stop()
+    # waits for the payout runs in progress
+    remittance_job_runner.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -10,6 +10,7 @@ import uuid
 from pydantic import EmailStr
 from sqlmodel import Field, Relationship, SQLModel, Enum
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import FetchedValue, Index, text
 
 # Shared properties
 
@@ -139,6 +140,11 @@ class NewPassword(SQLModel):
 
 # # implementation
 
+def utcnow() -> datetime:
+    """Now in UTC, naive like the `timestamp` columns give it back."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 # -----------------------------
 # Task Model
 # -----------------------------
@@ -148,13 +154,30 @@ class Task(SQLModel, table=True):
     title: str = Field(index=True)
     description: Optional[str] = None
     created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
+        default_factory=utcnow)
     updated_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
+        default_factory=utcnow, index=True)
 
     # Relationships
     worklogs: List["WorkLog"] = Relationship(back_populates="task")
 
+
+def change_stamp():  # type: ignore[no-untyped-def]
+    """
+    A change timestamp the database stamps on every insert and update (the
+    `stamp_*` triggers the change feed relies on); the ORM reads it back
+    with RETURNING instead of writing its own.
+    """
+    return Field(
+        default=None,
+        nullable=False,
+        index=True,
+        sa_column_kwargs={
+            "server_default": FetchedValue(),
+            "server_onupdate": FetchedValue(),
+        },
+    )
+
 # -----------------------------
 # WorkLog Model
 # -----------------------------
@@ -162,14 +185,24 @@ class Task(SQLModel, table=True):
 
 class WorkLog(SQLModel, table=True):
     """Container for all work done against a task by a user."""
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # keyset pagination of the worklog listing
+        Index("ix_worklog_created_at_id", "created_at", "id"),
+        # per-user / per-task listings over a date range
+        Index("ix_worklog_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_worklog_task_id_created_at", "task_id", "created_at", "id"),
+    )
+
     id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id", index=True)
     task_id: UUID = Field(foreign_key="task.id", index=True)
     created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
+        default_factory=utcnow)
+    updated_at: Optional[datetime] = change_stamp()
+    # kept in step with the segments on every write, so reads never aggregate
     total_duration_minutes: float = Field(nullable=False)
+    segment_count: int = Field(default=0, nullable=False)
 
     # Relationships
     user: "User" = Relationship(back_populates="worklogs")
@@ -185,25 +218,160 @@ class WorkLog(SQLModel, table=True):
 
 
 class TimeSegment(SQLModel, table=True):
-    """A single time recording session."""
-    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    """
+    A single time recording session.
+
+    Range partitioned by month on `start_time` (partitions `timesegment_pYYYY_MM`
+    plus `timesegment_default`), so period queries only touch the months
+    they cover and an old month can be detached as a whole. The partition
+    key has to be part of the primary key.
+    """
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # a user's segments by period ("my week")
+        Index("ix_timesegment_user_id_start_time", "user_id", "start_time", "id"),
+        # the overlap check: a user's segments ending after a given time
+        Index("ix_timesegment_user_id_end_time", "user_id", "end_time"),
+        # only the open (not yet paid) segments, the hot subset for payouts
+        Index(
+            "ix_timesegment_unremitted_worklog_id",
+            "worklog_id",
+            postgresql_where=text("remittance_id IS NULL"),
+        ),
+        # what a payout run scans: a user's unpaid segments by period
+        Index(
+            "ix_timesegment_unremitted_user_id_start_time",
+            "user_id",
+            "start_time",
+            postgresql_where=text("remittance_id IS NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
+
+    # matches the rows a batched INSERT ... RETURNING gives back to the
+    # objects written; start_time, the rest of the key, comes back naive
+    id: UUID = Field(
+        default_factory=uuid.uuid4,
+        primary_key=True,
+        sa_column_kwargs={"insert_sentinel": True},
+    )
     worklog_id: UUID = Field(foreign_key="worklog.id", index=True)
     user_id: UUID = Field(foreign_key="user.id", index=True)
-    start_time: datetime
+    # set once a remittance run has paid for this segment
+    remittance_id: Optional[UUID] = Field(
+        default=None, foreign_key="remittance.id")
+    start_time: datetime = Field(primary_key=True)
     end_time: datetime
     description: Optional[str] = None
     notes: Optional[str] = None
     recorded_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
+        default_factory=utcnow)
     created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
+        default_factory=utcnow)
+    updated_at: Optional[datetime] = change_stamp()
 
     # Relationships
     worklog: WorkLog = Relationship(back_populates="time_segments")
 
 
+# -----------------------------
+# Tombstone Model
+# -----------------------------
+
+
+class Tombstone(SQLModel, table=True):
+    """Left behind by a delete so change feed consumers can drop the row too."""
+    __mapper_args__ = {"eager_defaults": True}
+
+    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    entity: str            # "worklog" or "time_segment"
+    entity_id: UUID
+    deleted_at: Optional[datetime] = change_stamp()
+
+
+# -----------------------------
+# IdempotencyKey Model
+# -----------------------------
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """Outcome of a create request, replayed when the client retries with the same key."""
+    user_id: UUID = Field(
+        foreign_key="user.id", primary_key=True, ondelete="CASCADE")
+    key: str = Field(primary_key=True, max_length=255)
+    # endpoint + body fingerprint; a key may not be reused for another request
+    request_hash: str = Field(max_length=64)
+    # both null while the first request is still being processed
+    status_code: Optional[int] = None
+    response: Optional[str] = None
+    created_at: datetime = Field(
+        default_factory=utcnow)
+    expires_at: datetime = Field(index=True)
+
+
+# -----------------------------
+# ImportJob Model
+# -----------------------------
+
+
+class ImportJob(SQLModel, table=True):
+    """Progress of a bulk time segment import, so a broken upload can resume."""
+    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    filename: Optional[str] = None
+    status: str = Field(default="RUNNING")   # RUNNING, COMPLETED or FAILED
+    # input rows consumed so far; a resumed upload skips this many rows
+    rows_committed: int = Field(default=0)
+    rows_imported: int = Field(default=0)
+    rows_rejected: int = Field(default=0)
+    error: Optional[str] = None
+    created_at: datetime = Field(
+        default_factory=utcnow)
+    updated_at: datetime = Field(
+        default_factory=utcnow)
+
+
+# -----------------------------
+# RemittanceJob Model
+# -----------------------------
+
+
+class RemittanceJob(SQLModel, table=True):
+    """A payout run executed in the background, with its progress."""
+    id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # PENDING, RUNNING, COMPLETED, FAILED or CANCELLED
+    status: str = Field(default="PENDING", index=True)
+    amount_per_hour: float
+    period_start: datetime
+    period_end: datetime
+    users_total: int = Field(default=0)
+    users_done: int = Field(default=0)
+    remittances_created: int = Field(default=0)
+    # checked by the worker between chunks
+    cancel_requested: bool = Field(default=False)
+    error: Optional[str] = None
+    created_at: datetime = Field(
+        default_factory=utcnow)
+    updated_at: datetime = Field(
+        default_factory=utcnow)
+    finished_at: Optional[datetime] = None
+
+
+class RemittanceJobChunk(SQLModel, table=True):
+    """
+    Checkpoint of one user-id range of a payout run. Committed together with
+    the range's remittances, so a resumed run skips the completed ranges.
+    """
+    job_id: UUID = Field(
+        foreign_key="remittancejob.id", primary_key=True, ondelete="CASCADE")
+    index: int = Field(primary_key=True)
+    first_user_id: UUID
+    last_user_id: UUID
+    users: int
+    status: str = Field(default="PENDING")   # PENDING or COMPLETED
+    remittances_created: int = Field(default=0)
+    finished_at: Optional[datetime] = None
+
+
 # -----------------------------
 # Remittance Model
 # -----------------------------
@@ -211,6 +379,19 @@ class TimeSegment(SQLModel, table=True):
 
 class Remittance(SQLModel, table=True):
     """Payment batch for a user covering a period."""
+    __table_args__ = (
+        # keyset pagination of the remittance listing
+        Index("ix_remittance_created_at_id", "created_at", "id"),
+        # listing filters and totals by status and period; the amount is
+        # included so count and sum are answered from the index alone
+        Index(
+            "ix_remittance_status_period_end",
+            "status",
+            "period_end",
+            postgresql_include=["total_amount"],
+        ),
+    )
+
     id: UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id", index=True)
     total_amount: float
@@ -218,9 +399,9 @@ class Remittance(SQLModel, table=True):
     period_start: datetime
     period_end: datetime
     created_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
+        default_factory=utcnow)
     updated_at: datetime = Field(
-        default_factory=lambda: datetime.now(timezone.utc))
+        default_factory=utcnow)
     paid_at: Optional[datetime] = None
 
     # Relationships
@@ -3,7 +3,9 @@ from datetime import datetime
 from typing import Optional
 from uuid import UUID
 from sqlmodel import SQLModel
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, Field, model_validator
+
+from app.utils import naive_utc
 
 
 class TaskCreateIn(BaseModel):
@@ -41,6 +43,16 @@ class WorkLogCreateIn(BaseModel):
     time_segments: list[TimeSegmentIn]
 
 
+class WorkLogBulkCreateIn(BaseModel):
+    """Many worklogs, created in a single transaction."""
+    worklogs: list[WorkLogCreateIn] = Field(min_length=1, max_length=5000)
+
+
+class WorkLogBulkCreateOut(BaseModel):
+    ids: list[UUID]
+    count: int
+
+
 class TimeSegmentOut(BaseModel):
     """Time segment with calculated duration."""
     id: UUID
@@ -57,6 +69,12 @@ class TimeSegmentOut(BaseModel):
         orm_mode = True
 
 
+class TimeSegmentPageOut(BaseModel):
+    """One page of time segments; pass `next_cursor` back to fetch the next one."""
+    data: list[TimeSegmentOut]
+    next_cursor: Optional[str] = None
+
+
 class WorkLogOut(BaseModel):
     """WorkLog with calculated totals."""
     id: UUID
@@ -65,7 +83,53 @@ class WorkLogOut(BaseModel):
     created_at: datetime
     total_duration_minutes: float  # Calculated from time_segments
     segment_count: int             # Number of time segments
+    # left out when the caller asks for `include_segments=false`
+    time_segments: Optional[list[TimeSegmentOut]] = None
+
+
+class WorkLogPageOut(BaseModel):
+    """One page of worklogs; pass `next_cursor` back to fetch the next one."""
+    data: list[WorkLogOut]
+    next_cursor: Optional[str] = None
+
+
+class TombstoneOut(BaseModel):
+    entity: str
+    entity_id: UUID
+    deleted_at: datetime
+
+
+class ChangeFeedOut(BaseModel):
+    """
+    Worklogs and time segments created or updated, and rows deleted, after
+    the `since` cursor. Store `next_cursor` and pass it as `since` next time.
+    """
+    worklogs: list[WorkLogOut]
     time_segments: list[TimeSegmentOut]
+    deleted: list[TombstoneOut]
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+
+class WorkLogSummaryGroupByIn(str, Enum):
+    USER = "user"
+    TASK = "task"
+    DAY = "day"
+
+
+class WorkLogSummaryRowOut(BaseModel):
+    """Totals of one group (a user id, a task id or a day)."""
+    key: str
+    total_duration_minutes: float
+    worklog_count: int
+    segment_count: int
+    first_start_time: datetime
+    last_end_time: datetime
+
+
+class WorkLogSummaryOut(BaseModel):
+    group_by: WorkLogSummaryGroupByIn
+    data: list[WorkLogSummaryRowOut]
 
 
 class DeleteTimeSegmentOut(BaseModel):
@@ -84,6 +148,44 @@ class UpdateTimeSegmentOut(BaseModel):
     description: str
 
 
+class TimeSegmentPatchIn(UpdateTimeSegmentIn):
+    id: UUID
+
+    @model_validator(mode='after')
+    def end_after_start(self) -> "TimeSegmentPatchIn":
+        # after parsing, so offsets are compared as instants
+        if naive_utc(self.end_time) <= naive_utc(self.start_time):
+            raise ValueError('end_time must be after start_time')
+        return self
+
+
+class TimeSegmentBatchUpdateIn(BaseModel):
+    time_segments: list[TimeSegmentPatchIn] = Field(min_length=1, max_length=1000)
+
+
+class TimeSegmentBatchDeleteIn(BaseModel):
+    ids: list[UUID] = Field(min_length=1, max_length=1000)
+
+
+class TimeSegmentBatchOut(BaseModel):
+    count: int
+
+
+class TimerStartIn(BaseModel):
+    worklog_id: UUID
+    description: Optional[str] = None
+    notes: Optional[str] = None
+
+
+class TimerOut(BaseModel):
+    """A live timer; `end_time` is set once it has been stopped."""
+    worklog_id: UUID
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    description: Optional[str] = None
+    notes: Optional[str] = None
+
+
 # ============================================================================
 # USAGE EXAMPLE
 # ============================================================================
@@ -94,6 +196,88 @@ class RemittanceStatusSchemaIn(str, Enum):
     UNREMITTED = "UNREMITTED"
 
 
+class RemittanceOut(BaseModel):
+    id: UUID
+    user_id: UUID
+    total_amount: float
+    status: str
+    period_start: datetime
+    period_end: datetime
+    created_at: datetime
+    paid_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class RemittancePageOut(BaseModel):
+    """
+    One page of remittances; pass `next_cursor` back to fetch the next one.
+    `count` and `total_amount` cover every match of the filters and are only
+    returned with the first page.
+    """
+    data: list[RemittanceOut]
+    next_cursor: Optional[str] = None
+    count: Optional[int] = None
+    total_amount: Optional[float] = None
+
+
+class RemittanceJobOut(BaseModel):
+    """A payout run; poll until `status` is COMPLETED, FAILED or CANCELLED."""
+    id: UUID
+    status: str
+    amount_per_hour: float
+    period_start: datetime
+    period_end: datetime
+    users_total: int
+    users_done: int
+    remittances_created: int
+    cancel_requested: bool
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ExportDatasetIn(str, Enum):
+    TIME_SEGMENTS = "time_segments"
+    WORKLOGS = "worklogs"
+
+
+class ExportFormatIn(str, Enum):
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+class ImportFormatIn(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class TimeSegmentImportRowIn(TimeSegmentIn):
+    """One line of a historic backfill: a segment plus the worklog it belongs to."""
+    worklog_id: UUID
+    user_id: UUID
+    task_id: UUID
+
+
+class ImportJobOut(BaseModel):
+    id: UUID
+    filename: Optional[str] = None
+    status: str
+    rows_committed: int
+    rows_imported: int
+    rows_rejected: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    # validation errors of this upload only, capped
+    errors: list[str] = []
+
+
 """
 Example workflow:
 
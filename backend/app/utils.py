@@ -1,4 +1,8 @@
+import base64
+import hashlib
+import json
 import logging
+import uuid
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
@@ -121,3 +125,40 @@ def verify_password_reset_token(token: str) -> str | None:
         return str(decoded_token["sub"])
     except InvalidTokenError:
         return None
+
+
+def naive_utc(value: datetime) -> datetime:
+    """`value` in UTC without tzinfo, as the `timestamp` columns store it."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def encode_cursor(position: datetime, row_id: uuid.UUID) -> str:
+    """Encode a keyset position `(timestamp, id)` as an opaque page cursor."""
+    payload = json.dumps([position.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID] | None:
+    try:
+        position, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(position), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def make_etag(*parts: object) -> str:
+    """Weak ETag derived from a collection version and whatever shapes the response."""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an `If-None-Match` header against `etag`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
@@ -0,0 +1,42 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from tests.utils.worklog import create_random_worklog
+
+
+def test_export_time_segments_parquet(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    worklog = create_random_worklog(db, segments=3)
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/export-analytics",
+        headers=superuser_token_headers,
+        params={"dataset": "time_segments", "format": "parquet"},
+    )
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    rows = [row for row in table.to_pylist() if row["worklog_id"] == str(worklog.id)]
+    assert len(rows) == 3
+    assert {row["id"] for row in rows} == {str(ts.id) for ts in worklog.time_segments}
+
+
+def test_export_worklogs_arrow(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    worklog = create_random_worklog(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/export-analytics",
+        headers=superuser_token_headers,
+        params={"dataset": "worklogs", "format": "arrow"},
+    )
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.content).read_all()
+    rows = [row for row in table.to_pylist() if row["id"] == str(worklog.id)]
+    assert rows[0]["total_duration_minutes"] == worklog.total_duration_minutes
+    assert rows[0]["segment_count"] == worklog.segment_count == 2
+
@@ -0,0 +1,162 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app import crud
+from app.core.config import settings
+from app.models import ImportJob, TimeSegment, WorkLog
+from tests.utils.worklog import create_random_task, create_random_worklog
+
+CSV_HEADER = "worklog_id,user_id,task_id,start_time,end_time,description,notes\n"
+
+
+def _csv_row(
+    worklog_id: uuid.UUID,
+    user_id: uuid.UUID,
+    task_id: uuid.UUID,
+    start: datetime,
+    minutes: int,
+) -> str:
+    end = start + timedelta(minutes=minutes)
+    return f"{worklog_id},{user_id},{task_id},{start.isoformat()},{end.isoformat()},backfill,\n"
+
+
+def test_import_time_segments_csv(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    assert user
+    task = create_random_task(db)
+    worklog_id = uuid.uuid4()
+    start = datetime(2024, 3, 1, 9, 0)
+    content = (
+        CSV_HEADER
+        + _csv_row(worklog_id, user.id, task.id, start, 30)
+        + _csv_row(worklog_id, user.id, task.id, start + timedelta(hours=1), 45)
+        # ends before it starts
+        + _csv_row(worklog_id, user.id, task.id, start, -10)
+        # unknown task
+        + _csv_row(uuid.uuid4(), user.id, uuid.uuid4(), start, 30)
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/import-time-segments",
+        headers=superuser_token_headers,
+        files={"file": ("segments.csv", content, "text/csv")},
+        params={"chunk_size": 2},
+    )
+    assert response.status_code == 200
+    job = response.json()
+    assert job["status"] == "COMPLETED"
+    assert job["rows_committed"] == 4
+    assert job["rows_imported"] == 2
+    assert job["rows_rejected"] == 2
+    assert job["errors"][0].startswith("row 3:")
+
+    worklog = db.get(WorkLog, worklog_id)
+    assert worklog
+    db.refresh(worklog)
+    assert worklog.total_duration_minutes == 75
+    assert worklog.segment_count == 2
+    segments = db.exec(
+        select(TimeSegment).where(TimeSegment.worklog_id == worklog_id)
+    ).all()
+    assert len(segments) == 2
+    assert all(segment.notes is None for segment in segments)
+
+
+def test_import_time_segments_converts_offsets_to_utc(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    assert user
+    task = create_random_task(db)
+    worklog_id = uuid.uuid4()
+    start = datetime(2024, 3, 4, 11, 0, tzinfo=timezone(timedelta(hours=2)))
+    content = CSV_HEADER + _csv_row(worklog_id, user.id, task.id, start, 30)
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/import-time-segments",
+        headers=superuser_token_headers,
+        files={"file": ("segments.csv", content, "text/csv")},
+    )
+    assert response.status_code == 200
+    assert response.json()["rows_imported"] == 1
+
+    segment = db.exec(
+        select(TimeSegment).where(TimeSegment.worklog_id == worklog_id)
+    ).one()
+    assert segment.start_time == datetime(2024, 3, 4, 9, 0)
+    assert segment.end_time == datetime(2024, 3, 4, 9, 30)
+
+
+def test_import_time_segments_ndjson_into_existing_worklog(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    worklog = create_random_worklog(db, segments=1)
+    start = datetime(2024, 3, 2, 9, 0)
+    content = "\n".join(
+        [
+            json.dumps(
+                {
+                    "worklog_id": str(worklog.id),
+                    "user_id": str(worklog.user_id),
+                    "task_id": str(worklog.task_id),
+                    "start_time": start.isoformat(),
+                    "end_time": (start + timedelta(minutes=60)).isoformat(),
+                }
+            ),
+            "{not json",
+        ]
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/import-time-segments",
+        headers=superuser_token_headers,
+        files={"file": ("segments.ndjson", content, "application/x-ndjson")},
+    )
+    assert response.status_code == 200
+    job = response.json()
+    assert job["rows_imported"] == 1
+    assert job["rows_rejected"] == 1
+    db.refresh(worklog)
+    assert worklog.total_duration_minutes == 90
+    assert len(worklog.time_segments) == 2
+
+
+def test_import_time_segments_resume(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    assert user
+    task = create_random_task(db)
+    worklog_id = uuid.uuid4()
+    start = datetime(2024, 3, 3, 9, 0)
+    content = CSV_HEADER + "".join(
+        _csv_row(worklog_id, user.id, task.id, start + timedelta(hours=i), 30)
+        for i in range(3)
+    )
+    # the first row made it in before the upload broke off
+    job = ImportJob(filename="segments.csv", status="FAILED", rows_committed=1)
+    db.add(job)
+    db.commit()
+
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/import-time-segments",
+        headers=superuser_token_headers,
+        files={"file": ("segments.csv", content, "text/csv")},
+        params={"job_id": str(job.id)},
+    )
+    assert response.status_code == 200
+    assert response.json()["rows_committed"] == 3
+    assert response.json()["rows_imported"] == 2
+
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/import-jobs/{job.id}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "COMPLETED"
+    worklog = db.get(WorkLog, worklog_id)
+    assert worklog
+    assert len(worklog.time_segments) == 2
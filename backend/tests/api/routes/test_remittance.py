@@ -0,0 +1,326 @@
+import os
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, select
+
+from app.api.routes.remittance.jobs import (
+    RemittanceJobService,
+    remittance_job_runner,
+    run_remittance_job,
+)
+from app.api.routes.remittance.service import RemittanceService
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Remittance, RemittanceJob, RemittanceJobChunk, TimeSegment
+from tests.utils.worklog import create_random_worklog
+
+
+def _run_payout(
+    client: TestClient, start_date: datetime, end_date: datetime
+) -> dict[str, Any]:
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/generate-remittances-for-all-users",
+        json={
+            "amount_per_hour": 60,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+        },
+    )
+    assert response.status_code == 202
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/remittance-jobs/{response.json()['id']}",
+        params={"wait": 10},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_generate_remittances_one_per_user(client: TestClient, db: Session) -> None:
+    first = create_random_worklog(db, segments=2)
+    second = create_random_worklog(db, segments=1)
+    # the second worklog lies a day further back than the first
+    start_date = min(ts.start_time for ts in second.time_segments)
+    end_date = max(ts.end_time for ts in first.time_segments)
+
+    job = _run_payout(client, start_date, end_date)
+    assert job["status"] == "COMPLETED"
+    assert job["users_done"] == job["users_total"] == job["remittances_created"] == 2
+
+    remittances = db.exec(
+        select(Remittance).where(
+            col(Remittance.user_id).in_([first.user_id, second.user_id])
+        )
+    ).all()
+    amounts = {remittance.user_id: remittance.total_amount for remittance in remittances}
+    assert amounts == {first.user_id: 60, second.user_id: 30}
+    by_user = {remittance.user_id: remittance.id for remittance in remittances}
+    segments = db.exec(
+        select(TimeSegment).where(
+            col(TimeSegment.worklog_id).in_([first.id, second.id])
+        )
+    ).all()
+    assert len(segments) == 3
+    for segment in segments:
+        db.refresh(segment)
+        assert segment.remittance_id == by_user[segment.user_id]
+
+
+def test_cancel_remittance_job(client: TestClient, db: Session) -> None:
+    now = datetime.now(timezone.utc)
+    # not handed to the workers, so it stays pending until cancelled
+    job = RemittanceJob(
+        amount_per_hour=60, period_start=now - timedelta(days=7), period_end=now
+    )
+    db.add(job)
+    db.commit()
+    url = f"{settings.API_V1_STR}/assessment_task/remittance-jobs/{job.id}"
+
+    response = client.post(f"{url}/cancel")
+    assert response.status_code == 200
+    assert response.json()["status"] == "CANCELLED"
+    assert response.json()["cancel_requested"] is True
+    # a worker picking it up afterwards leaves it alone
+    run_remittance_job(job.id)
+    assert client.get(url).json()["status"] == "CANCELLED"
+
+    response = client.post(f"{url}/cancel")
+    assert response.status_code == 409
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/remittance-jobs/{uuid.uuid4()}"
+    )
+    assert response.status_code == 404
+
+
+def test_resume_remittance_job_skips_completed_chunks(
+    client: TestClient, db: Session
+) -> None:
+    done = create_random_worklog(db, segments=1)
+    left = create_random_worklog(db, segments=1)
+    job = RemittanceJob(
+        status="FAILED",
+        amount_per_hour=0.35,
+        period_start=left.time_segments[0].start_time,
+        period_end=done.time_segments[0].end_time,
+        users_total=2,
+        users_done=1,
+    )
+    db.add(job)
+    db.commit()
+    # the first user-id range was settled before the run failed
+    for index, worklog in enumerate([done, left]):
+        db.add(
+            RemittanceJobChunk(
+                job_id=job.id,
+                index=index,
+                first_user_id=worklog.user_id,
+                last_user_id=worklog.user_id,
+                users=1,
+                status="COMPLETED" if worklog is done else "PENDING",
+            )
+        )
+    db.commit()
+    url = f"{settings.API_V1_STR}/assessment_task/remittance-jobs/{job.id}"
+
+    response = client.post(f"{url}/resume")
+    assert response.status_code == 202
+    response = client.get(url, params={"wait": 10})
+    assert response.json()["status"] == "COMPLETED"
+    assert response.json()["users_done"] == 2
+    assert response.json()["remittances_created"] == 1
+
+    remittances = db.exec(
+        select(Remittance).where(
+            col(Remittance.user_id).in_([done.user_id, left.user_id])
+        )
+    ).all()
+    # 30 minutes at 0.35 an hour is 0.175, rounded half up to the cent
+    assert [(r.user_id, r.total_amount) for r in remittances] == [(left.user_id, 0.18)]
+    assert client.post(f"{url}/resume").status_code == 409
+
+
+def test_generate_remittances_only_settles_unpaid_time(
+    client: TestClient, db: Session
+) -> None:
+    worklog = create_random_worklog(db, segments=2)
+    first, second = sorted(worklog.time_segments, key=lambda ts: ts.start_time)
+    end_date = second.end_time
+    # only the first segment falls into the first run's period
+    assert _run_payout(client, first.start_time, first.end_time)["remittances_created"] == 1
+
+    # the same period again finds nothing left to pay
+    job = _run_payout(client, first.start_time, first.end_time)
+    assert job["status"] == "COMPLETED"
+    assert job["users_total"] == job["remittances_created"] == 0
+
+    # a wider period pays the second segment only
+    assert _run_payout(client, first.start_time, end_date)["remittances_created"] == 1
+    amounts = db.exec(
+        select(Remittance.total_amount).where(Remittance.user_id == worklog.user_id)
+    ).all()
+    assert sorted(amounts) == [30, 30]
+
+
+def test_list_remittances_paginated_with_totals(client: TestClient, db: Session) -> None:
+    user_id = create_random_worklog(db, segments=1).user_id
+    now = datetime.now(timezone.utc)
+    rows = [(30, 10.5, "PAID"), (20, 20, "PENDING"), (10, 30, "PENDING")]
+    for days, amount, remittance_status in rows:
+        db.add(
+            Remittance(
+                user_id=user_id,
+                total_amount=amount,
+                status=remittance_status,
+                period_start=now - timedelta(days=days + 7),
+                period_end=now - timedelta(days=days),
+            )
+        )
+    db.commit()
+    url = f"{settings.API_V1_STR}/assessment_task/get-all-remittances"
+
+    response = client.get(url, params={"user_id": str(user_id), "limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert (page["count"], page["total_amount"]) == (3, 60.5)
+    assert len(page["data"]) == 2
+    response = client.get(
+        url, params={"user_id": str(user_id), "limit": 2, "cursor": page["next_cursor"]}
+    )
+    last = response.json()
+    assert len(last["data"]) == 1
+    assert last["next_cursor"] is None
+    assert last["count"] is None
+    assert {r["id"] for r in page["data"] + last["data"]} == {
+        str(r.id) for r in db.exec(select(Remittance).where(Remittance.user_id == user_id))
+    }
+
+    response = client.get(
+        url,
+        params={
+            "user_id": str(user_id),
+            "status": "PENDING",
+            "period_from": (now - timedelta(days=15)).isoformat(),
+        },
+    )
+    page = response.json()
+    assert (page["count"], page["total_amount"]) == (1, 30)
+    assert [r["total_amount"] for r in page["data"]] == [30]
+
+    response = client.get(url, params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_resume_running_job_once_its_lease_expired(client: TestClient, db: Session) -> None:
+    worklog = create_random_worklog(db, segments=1)
+    segment = worklog.time_segments[0]
+    now = datetime.now(timezone.utc)
+    live, stale = (
+        RemittanceJob(
+            status="RUNNING",
+            amount_per_hour=60,
+            period_start=segment.start_time,
+            period_end=segment.end_time,
+            updated_at=updated_at,
+        )
+        for updated_at in (now, now - timedelta(hours=1))
+    )
+    db.add_all([live, stale])
+    db.commit()
+    url = f"{settings.API_V1_STR}/assessment_task/remittance-jobs"
+
+    # still renewing its lease somewhere
+    assert client.post(f"{url}/{live.id}/resume").status_code == 409
+    # its process died mid-run; what a restart does to it
+    assert RemittanceJobService.fail_stale_jobs(db) >= 1
+    db.refresh(live)
+    db.refresh(stale)
+    assert (live.status, stale.status) == ("RUNNING", "FAILED")
+    assert client.post(f"{url}/{stale.id}/resume").status_code == 202
+    response = client.get(f"{url}/{stale.id}", params={"wait": 10})
+    assert response.json()["status"] == "COMPLETED"
+    assert response.json()["remittances_created"] == 1
+
+
+def test_settle_chunk_leaves_segments_committed_after_its_lock(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    worklog = create_random_worklog(db, segments=1)
+    segment = worklog.time_segments[0]
+    job = RemittanceJob(
+        status="RUNNING",
+        amount_per_hour=60,
+        period_start=segment.start_time,
+        period_end=segment.end_time + timedelta(hours=2),
+        users_total=1,
+    )
+    db.add(job)
+    db.commit()
+    chunk = RemittanceJobChunk(
+        job_id=job.id,
+        index=0,
+        first_user_id=worklog.user_id,
+        last_user_id=worklog.user_id,
+        users=1,
+    )
+    db.add(chunk)
+    db.commit()
+    late_id = uuid.uuid4()
+    late = TimeSegment(
+        id=late_id,
+        worklog_id=worklog.id,
+        user_id=worklog.user_id,
+        start_time=segment.end_time + timedelta(minutes=30),
+        end_time=segment.end_time + timedelta(minutes=60),
+    )
+
+    with Session(engine) as session:
+        exec_ = session.exec
+
+        def exec_then_commit_late(statement: Any, *args: Any, **kwargs: Any) -> Any:
+            result = exec_(statement, *args, **kwargs)
+            if getattr(statement, "_for_update_arg", None) is not None:
+                # a late entry commits right after the payout locked its segments
+                with Session(engine) as writer:
+                    writer.add(late)
+                    writer.commit()
+            return result
+
+        monkeypatch.setattr(session, "exec", exec_then_commit_late)
+        settled = session.get(RemittanceJob, job.id)
+        assert settled
+        chunk = session.get(RemittanceJobChunk, (job.id, 0))
+        assert chunk
+        created = RemittanceService._settle_chunk(session, settled, chunk)
+    assert created == 1
+
+    remittance = db.exec(
+        select(Remittance).where(Remittance.user_id == worklog.user_id)
+    ).one()
+    assert remittance.total_amount == 30
+    db.refresh(segment)
+    assert segment.remittance_id == remittance.id
+    late_segment = db.exec(select(TimeSegment).where(TimeSegment.id == late_id)).one()
+    assert late_segment.remittance_id is None
+
+
+def test_payout_after_a_worker_process_died(client: TestClient, db: Session) -> None:
+    worklog = create_random_worklog(db, segments=1)
+    segment = worklog.time_segments[0]
+    broken = remittance_job_runner.process_pool()
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+
+    job = _run_payout(client, segment.start_time, segment.end_time)
+    assert job["status"] == "FAILED"
+    assert "worker process died" in job["error"]
+    assert remittance_job_runner.process_pool() is not broken
+
+    url = f"{settings.API_V1_STR}/assessment_task/remittance-jobs/{job['id']}"
+    assert client.post(f"{url}/resume").status_code == 202
+    job = client.get(url, params={"wait": 10}).json()
+    assert job["status"] == "COMPLETED"
+    assert job["remittances_created"] == 1
@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from tests.utils.worklog import create_random_task
+
+
+def test_get_all_tasks_conditional_get(client: TestClient, db: Session) -> None:
+    create_random_task(db)
+    url = f"{settings.API_V1_STR}/assessment_task/get-all-tasks"
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    create_random_task(db)
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_create_task_is_a_single_insert(client: TestClient) -> None:
+    statements: list[str] = []
+
+    def record(_conn, _cursor, statement, *_) -> None:  # type: ignore[no-untyped-def]
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.post(
+            f"{settings.API_V1_STR}/assessment_task/create-task",
+            json={"title": "write-up", "description": None},
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 201
+    assert response.json()["title"] == "write-up"
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT INTO task")
@@ -0,0 +1,970 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, col, select
+
+from app import crud
+from app.api.routes.worklogs.service import IdempotencyService
+from app.api.routes.worklogs.timer import flush_timers
+from app.core.config import settings
+from app.core.db import engine, ensure_time_segment_partitions
+from app.models import Remittance, TimeSegment, UserCreate, WorkLog
+from tests.utils.user import create_random_user, user_authentication_headers
+from tests.utils.utils import random_email, random_lower_string
+from tests.utils.worklog import create_random_task, create_random_worklog
+
+
+def test_list_worklogs_paginates_with_cursor(
+    client: TestClient, db: Session
+) -> None:
+    created = {str(create_random_worklog(db).id) for _ in range(3)}
+    seen: list[str] = []
+    params = {"remittance_status": "UNREMITTED", "limit": 2}
+    while True:
+        response = client.get(
+            f"{settings.API_V1_STR}/assessment_task/list-all-worklogs",
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        assert len(content["data"]) <= 2
+        seen.extend(worklog["id"] for worklog in content["data"])
+        if content["next_cursor"] is None:
+            break
+        params["cursor"] = content["next_cursor"]
+    assert len(seen) == len(set(seen))
+    assert created <= set(seen)
+
+
+def test_list_worklogs_includes_segments(client: TestClient, db: Session) -> None:
+    worklog = create_random_worklog(db, segments=3)
+    params = {"remittance_status": "UNREMITTED", "limit": 1000}
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/list-all-worklogs", params=params
+    )
+    assert response.status_code == 200
+    content = next(w for w in response.json()["data"] if w["id"] == str(worklog.id))
+    assert content["segment_count"] == 3
+    assert len(content["time_segments"]) == 3
+    assert content["total_duration_minutes"] == 90
+
+
+def test_list_worklogs_invalid_cursor(client: TestClient) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/list-all-worklogs",
+        params={"remittance_status": "UNREMITTED", "cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor."
+
+
+def test_export_worklogs_streams_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    worklog = create_random_worklog(db, segments=2)
+    url = f"{settings.API_V1_STR}/assessment_task/export-worklogs"
+    assert client.get(url).status_code == 401
+    email, password = random_email(), random_lower_string()
+    crud.create_user(
+        session=db,
+        user_create=UserCreate(email=email, password=password, is_superuser=False),
+    )
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    assert client.get(url, headers=headers).status_code == 403
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    content = next(w for w in lines if w["id"] == str(worklog.id))
+    assert content["segment_count"] == 2
+    assert len(content["time_segments"]) == 2
+
+
+def _listed_ids(client: TestClient, remittance_status: str) -> set[str]:
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/list-all-worklogs",
+        params={"remittance_status": remittance_status, "limit": 1000},
+    )
+    assert response.status_code == 200
+    return {worklog["id"] for worklog in response.json()["data"]}
+
+
+def test_list_worklogs_filters_by_remittance_status(
+    client: TestClient, db: Session
+) -> None:
+    paid = create_random_worklog(db)
+    open_ = create_random_worklog(db)
+    now = datetime.now(timezone.utc)
+    remittance = Remittance(
+        user_id=paid.user_id, total_amount=1.0, period_start=now, period_end=now
+    )
+    db.add(remittance)
+    db.flush()
+    for segment in paid.time_segments:
+        segment.remittance_id = remittance.id
+    db.commit()
+
+    remitted = _listed_ids(client, "REMITTED")
+    unremitted = _listed_ids(client, "UNREMITTED")
+    assert str(paid.id) in remitted
+    assert str(paid.id) not in unremitted
+    assert str(open_.id) in unremitted
+    assert str(open_.id) not in remitted
+
+
+def test_list_worklogs_without_segments(client: TestClient, db: Session) -> None:
+    worklog = create_random_worklog(db, segments=3)
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/list-all-worklogs",
+        params={"include_segments": False, "limit": 1000},
+    )
+    assert response.status_code == 200
+    content = next(w for w in response.json()["data"] if w["id"] == str(worklog.id))
+    assert content["segment_count"] == 3
+    assert content["time_segments"] is None
+
+
+def test_list_worklogs_sparse_fields(client: TestClient, db: Session) -> None:
+    worklog = create_random_worklog(db, segments=2)
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/list-all-worklogs",
+        params={"fields": "id,segment_count", "limit": 1000},
+    )
+    assert response.status_code == 200
+    content = next(w for w in response.json()["data"] if w["id"] == str(worklog.id))
+    assert content == {"id": str(worklog.id), "segment_count": 2}
+
+
+def test_list_worklogs_unknown_field(client: TestClient) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/list-all-worklogs",
+        params={"fields": "id,password"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown worklog fields: password."
+
+
+def test_query_worklogs_by_user_and_task(client: TestClient, db: Session) -> None:
+    worklog = create_random_worklog(db)
+    create_random_worklog(db, user_id=worklog.user_id)
+    create_random_worklog(db)
+
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/query-worklogs",
+        params={"user_id": str(worklog.user_id)},
+    )
+    assert response.status_code == 200
+    content = response.json()["data"]
+    assert len(content) == 2
+    assert all(w["user_id"] == str(worklog.user_id) for w in content)
+
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/query-worklogs",
+        params={"user_id": str(worklog.user_id), "task_id": str(worklog.task_id)},
+    )
+    assert [w["id"] for w in response.json()["data"]] == [str(worklog.id)]
+
+
+def test_query_worklogs_by_date_range(client: TestClient, db: Session) -> None:
+    worklog = create_random_worklog(db)
+    params = {
+        "user_id": str(worklog.user_id),
+        "created_from": (worklog.created_at - timedelta(minutes=1)).isoformat(),
+        "created_to": (worklog.created_at + timedelta(minutes=1)).isoformat(),
+    }
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/query-worklogs", params=params
+    )
+    assert [w["id"] for w in response.json()["data"]] == [str(worklog.id)]
+
+    params["created_from"] = params["created_to"]
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/query-worklogs", params=params
+    )
+    assert response.json()["data"] == []
+
+
+def test_user_time_segments_paginated_and_bounded(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=3)
+    first, second, third = sorted(worklog.time_segments, key=lambda ts: ts.start_time)
+
+    params = {
+        "from": first.start_time.isoformat(),
+        "to": third.start_time.isoformat(),
+        "limit": 1,
+    }
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/get-all-user-time-segments",
+        headers=normal_user_token_headers,
+        params=params,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert [ts["id"] for ts in content["data"]] == [str(first.id)]
+    assert content["next_cursor"]
+
+    params["cursor"] = content["next_cursor"]
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/get-all-user-time-segments",
+        headers=normal_user_token_headers,
+        params=params,
+    )
+    content = response.json()
+    assert [ts["id"] for ts in content["data"]] == [str(second.id)]
+    assert content["next_cursor"] is None
+
+
+def test_list_worklogs_conditional_get(client: TestClient, db: Session) -> None:
+    create_random_worklog(db)
+    url = f"{settings.API_V1_STR}/assessment_task/list-all-worklogs"
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(url, params={"limit": 5}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+    create_random_worklog(db)
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_worklogs_summary_by_user(client: TestClient, db: Session) -> None:
+    worklog = create_random_worklog(db, segments=2)
+    create_random_worklog(db, user_id=worklog.user_id, segments=3)
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/worklogs/summary",
+        params={"group_by": "user"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["group_by"] == "user"
+    row = next(r for r in content["data"] if r["key"] == str(worklog.user_id))
+    assert row["total_duration_minutes"] == 150
+    assert row["worklog_count"] == 2
+    assert row["segment_count"] == 5
+
+
+def test_worklogs_summary_by_day(client: TestClient, db: Session) -> None:
+    worklog = create_random_worklog(db, segments=1)
+    segment = worklog.time_segments[0]
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/worklogs/summary",
+        params={
+            "group_by": "day",
+            "from": segment.start_time.isoformat(),
+            "to": (segment.start_time + timedelta(seconds=1)).isoformat(),
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == [
+        {
+            "key": segment.start_time.date().isoformat(),
+            "total_duration_minutes": 30.0,
+            "worklog_count": 1,
+            "segment_count": 1,
+            "first_start_time": segment.start_time.isoformat(),
+            "last_end_time": segment.end_time.isoformat(),
+        }
+    ]
+
+
+def _drain_change_feed(client: TestClient, url: str) -> str | None:
+    since = None
+    while True:
+        content = client.get(url, params={"since": since} if since else {}).json()
+        since = content["next_cursor"]
+        if not content["has_more"]:
+            return since
+
+
+def test_change_feed_reports_updates_and_deletes(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/assessment_task/changes"
+    since = _drain_change_feed(client, url)
+
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=2)
+    deleted = worklog.time_segments[0]
+    response = client.delete(
+        f"{settings.API_V1_STR}/assessment_task/remove-time-segment",
+        headers=normal_user_token_headers,
+        params={"time_segment_id": str(deleted.id)},
+    )
+    assert response.status_code == 200
+
+    response = client.get(url, params={"since": since})
+    assert response.status_code == 200
+    content = response.json()
+    assert [w["id"] for w in content["worklogs"]] == [str(worklog.id)]
+    assert [ts["id"] for ts in content["time_segments"]] == [
+        str(worklog.time_segments[1].id)
+    ]
+    assert [(d["entity"], d["entity_id"]) for d in content["deleted"]] == [
+        ("time_segment", str(deleted.id))
+    ]
+
+    response = client.get(url, params={"since": content["next_cursor"]})
+    content = response.json()
+    assert content["worklogs"] == content["time_segments"] == content["deleted"] == []
+
+
+def test_change_feed_holds_back_changes_behind_open_writes(
+    client: TestClient, db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/assessment_task/changes"
+    since = _drain_change_feed(client, url)
+
+    user = create_random_user(db)
+    task = create_random_task(db)
+    with Session(engine) as slow:
+        slow_worklog = WorkLog(
+            user_id=user.id, task_id=task.id, total_duration_minutes=0
+        )
+        slow.add(slow_worklog)
+        slow.flush()
+        slow_id = slow_worklog.id
+        fast = create_random_worklog(db, user_id=user.id, segments=1)
+
+        # the committed worklog is newer than the open write, so it waits
+        content = client.get(url, params={"since": since}).json()
+        assert content["worklogs"] == []
+        slow.commit()
+
+    content = client.get(url, params={"since": since}).json()
+    assert [w["id"] for w in content["worklogs"]] == [str(slow_id), str(fast.id)]
+
+
+def test_create_worklogs_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    task = create_random_task(db)
+    start = datetime(2025, 3, 3, 9, 0)
+    payload = {
+        "worklogs": [
+            {
+                "task_id": str(task.id),
+                "time_segments": [
+                    {
+                        "start_time": (start + timedelta(days=i)).isoformat(),
+                        "end_time": (start + timedelta(days=i, hours=1)).isoformat(),
+                    }
+                ],
+            }
+            for i in range(3)
+        ]
+    }
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/create-worklogs-bulk",
+        headers=normal_user_token_headers,
+        json=payload,
+    )
+    assert response.status_code == 201
+    content = response.json()
+    assert content["count"] == 3
+    worklogs = db.exec(select(WorkLog).where(col(WorkLog.id).in_(content["ids"]))).all()
+    assert len(worklogs) == 3
+    assert all(w.total_duration_minutes == 60 for w in worklogs)
+    assert all(len(w.time_segments) == 1 for w in worklogs)
+    assert all(w.segment_count == 1 for w in worklogs)
+
+
+def test_create_worklogs_bulk_unknown_task(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    task_id = uuid.uuid4()
+    payload = {"worklogs": [{"task_id": str(task_id), "time_segments": []}]}
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/create-worklogs-bulk",
+        headers=normal_user_token_headers,
+        json=payload,
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"No tasks with the ids {task_id} found."
+
+
+def test_segment_update_and_delete_keep_worklog_totals(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=2)
+    first, second = worklog.time_segments
+    response = client.patch(
+        f"{settings.API_V1_STR}/assessment_task/update-time-segment",
+        headers=normal_user_token_headers,
+        params={"time_segment_id": str(first.id)},
+        json={
+            "start_time": first.start_time.isoformat(),
+            "end_time": (first.start_time + timedelta(minutes=50)).isoformat(),
+            "description": "longer",
+            "notes": None,
+        },
+    )
+    assert response.status_code == 200
+    db.refresh(worklog)
+    assert worklog.total_duration_minutes == 80
+    assert worklog.segment_count == 2
+
+    response = client.delete(
+        f"{settings.API_V1_STR}/assessment_task/remove-time-segment",
+        headers=normal_user_token_headers,
+        params={"time_segment_id": str(second.id)},
+    )
+    assert response.status_code == 200
+    db.refresh(worklog)
+    assert worklog.total_duration_minutes == 50
+    assert worklog.segment_count == 1
+
+
+def test_time_segments_are_routed_to_monthly_partitions(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    # the partitions up to TIME_SEGMENT_PARTITION_MONTHS_AHEAD already exist
+    assert ensure_time_segment_partitions(db) == 0
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=1)
+    segment = worklog.time_segments[0]
+    next_month = (datetime.now(timezone.utc).replace(day=1) + timedelta(days=32)).replace(
+        day=2, hour=9, minute=0, second=0, microsecond=0, tzinfo=None
+    )
+    response = client.patch(
+        f"{settings.API_V1_STR}/assessment_task/update-time-segment",
+        headers=normal_user_token_headers,
+        params={"time_segment_id": str(segment.id)},
+        json={
+            "start_time": next_month.isoformat(),
+            "end_time": (next_month + timedelta(minutes=30)).isoformat(),
+            "description": None,
+            "notes": None,
+        },
+    )
+    assert response.status_code == 200
+    # moving start_time across months moves the row into the other partition
+    partition = db.exec(  # type: ignore[call-overload]
+        text("SELECT tableoid::regclass::text FROM timesegment WHERE id = :id"),
+        params={"id": segment.id},
+    ).scalar_one()
+    assert partition == f"timesegment_p{next_month:%Y_%m}"
+
+
+def test_new_partition_takes_over_rows_of_the_default_partition(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=1)
+    segment_id = worklog.time_segments[0].id
+    # beyond the months created ahead, with a random day so reruns do not collide
+    far = datetime(2090 + uuid.uuid4().int % 9, 1 + uuid.uuid4().int % 12, 3, 9)
+    response = client.patch(
+        f"{settings.API_V1_STR}/assessment_task/update-time-segment",
+        headers=normal_user_token_headers,
+        params={"time_segment_id": str(segment_id)},
+        json={
+            "start_time": far.isoformat(),
+            "end_time": (far + timedelta(minutes=30)).isoformat(),
+            "description": None,
+            "notes": None,
+        },
+    )
+    assert response.status_code == 200
+    partition_of = text("SELECT tableoid::regclass::text FROM timesegment WHERE id = :id")
+    partition = db.exec(partition_of, params={"id": segment_id}).scalar_one()  # type: ignore[call-overload]
+    assert partition in ("timesegment_default", f"timesegment_p{far:%Y_%m}")
+
+    db.exec(  # type: ignore[call-overload]
+        text("SELECT create_timesegment_partitions(:month, :month)"),
+        params={"month": far.date()},
+    )
+    db.commit()
+    partition = db.exec(partition_of, params={"id": segment_id}).scalar_one()  # type: ignore[call-overload]
+    assert partition == f"timesegment_p{far:%Y_%m}"
+
+
+def test_create_worklog_async(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    task = create_random_task(db)
+    start = datetime(2025, 4, 1, 9, 0)
+    payload = {
+        "task_id": str(task.id),
+        "time_segments": [
+            {
+                "start_time": (start + timedelta(hours=i)).isoformat(),
+                "end_time": (start + timedelta(hours=i, minutes=20)).isoformat(),
+            }
+            for i in range(2)
+        ],
+    }
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/create-worklog-async",
+        headers=normal_user_token_headers,
+        json=payload,
+    )
+    assert response.status_code == 201
+    content = response.json()
+    assert content["total_duration_minutes"] == 40
+    assert content["segment_count"] == 2
+    worklog = db.get(WorkLog, uuid.UUID(content["id"]))
+    assert worklog
+    assert {str(ts.id) for ts in worklog.time_segments} == {
+        ts["id"] for ts in content["time_segments"]
+    }
+
+    payload["task_id"] = str(uuid.uuid4())
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/create-worklog-async",
+        headers=normal_user_token_headers,
+        json=payload,
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("path", ["create-wroklog", "create-worklog-async"])
+def test_created_worklog_matches_what_is_read_back(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session, path: str
+) -> None:
+    task = create_random_task(db)
+    offset = 0 if path == "create-wroklog" else 2
+    start = datetime(2025, 4, 3, 11 + offset, 0, tzinfo=timezone(timedelta(hours=2)))
+    payload = {
+        "task_id": str(task.id),
+        "time_segments": [
+            {
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=20)).isoformat(),
+            }
+        ],
+    }
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/{path}",
+        headers=normal_user_token_headers,
+        json=payload,
+    )
+    assert response.status_code == 201
+    created = response.json()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/assessment_task/query-worklogs",
+        params={"task_id": str(task.id)},
+    )
+    (listed,) = response.json()["data"]
+    assert created["created_at"] == listed["created_at"]
+    if "updated_at" in created:
+        stored = db.get(WorkLog, uuid.UUID(created["id"]))
+        assert stored
+        assert created["updated_at"] == stored.updated_at.isoformat()
+    if "time_segments" in created:
+        assert created["time_segments"] == listed["time_segments"]
+        assert created["time_segments"][0]["start_time"] == "2025-04-03T11:00:00"
+
+
+def test_create_worklog_idempotency_key_replays(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    task = create_random_task(db)
+    start = datetime(2025, 5, 1, 9, 0)
+    payload = {
+        "task_id": str(task.id),
+        "time_segments": [
+            {
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=30)).isoformat(),
+            }
+        ],
+    }
+    headers = {**normal_user_token_headers, "Idempotency-Key": str(uuid.uuid4())}
+    url = f"{settings.API_V1_STR}/assessment_task/create-wroklog"
+    first = client.post(url, headers=headers, json=payload)
+    assert first.status_code == 201
+    retry = client.post(url, headers=headers, json=payload)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert len(db.exec(select(WorkLog).where(WorkLog.task_id == task.id)).all()) == 1
+
+    payload["time_segments"][0]["description"] = "changed"
+    response = client.post(url, headers=headers, json=payload)
+    assert response.status_code == 422
+
+
+def test_create_worklog_idempotency_key_released_on_error(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    headers = {**normal_user_token_headers, "Idempotency-Key": str(uuid.uuid4())}
+    payload = {"task_id": str(uuid.uuid4()), "time_segments": []}
+    url = f"{settings.API_V1_STR}/assessment_task/create-worklog-async"
+    response = client.post(url, headers=headers, json=payload)
+    assert response.status_code == 404
+    # the failed attempt did not keep the key
+    payload["task_id"] = str(create_random_task(db).id)
+    response = client.post(url, headers=headers, json=payload)
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+
+
+def test_create_worklog_idempotency_key_rolled_back_with_create(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    task = create_random_task(db)
+    start = datetime(2025, 5, 2, 9, 0)
+    payload = {
+        "task_id": str(task.id),
+        "time_segments": [
+            {
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=30)).isoformat(),
+            }
+        ],
+    }
+    headers = {**normal_user_token_headers, "Idempotency-Key": str(uuid.uuid4())}
+    url = f"{settings.API_V1_STR}/assessment_task/create-wroklog"
+
+    def fail_store(*_: object) -> None:
+        raise RuntimeError("lost before the response was stored")
+
+    monkeypatch.setattr(IdempotencyService, "_store", staticmethod(fail_store))
+    with pytest.raises(RuntimeError):
+        client.post(url, headers=headers, json=payload)
+    # neither the worklog nor the reservation outlived the failure
+    assert db.exec(select(WorkLog).where(WorkLog.task_id == task.id)).all() == []
+    monkeypatch.undo()
+
+    response = client.post(url, headers=headers, json=payload)
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+
+
+def test_overlapping_time_segments_are_rejected(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    task = create_random_task(db)
+    start = datetime(2025, 6, 2, 9, 0)
+    url = f"{settings.API_V1_STR}/assessment_task/create-wroklog"
+
+    def segment(offset: int, minutes: int) -> dict[str, str]:
+        return {
+            "start_time": (start + timedelta(minutes=offset)).isoformat(),
+            "end_time": (start + timedelta(minutes=offset + minutes)).isoformat(),
+        }
+
+    payload = {"task_id": str(task.id), "time_segments": [segment(0, 60), segment(120, 60)]}
+    response = client.post(url, headers=normal_user_token_headers, json=payload)
+    assert response.status_code == 201
+
+    # reaches into the first segment
+    payload["time_segments"] = [segment(-30, 45)]
+    response = client.post(url, headers=normal_user_token_headers, json=payload)
+    assert response.status_code == 409
+    # covers the second segment completely
+    payload["time_segments"] = [segment(100, 200)]
+    response = client.post(url, headers=normal_user_token_headers, json=payload)
+    assert response.status_code == 409
+    # overlap within the request itself
+    payload["time_segments"] = [segment(300, 30), segment(310, 30)]
+    response = client.post(url, headers=normal_user_token_headers, json=payload)
+    assert response.status_code == 409
+    # back to back is fine
+    payload["time_segments"] = [segment(60, 60)]
+    response = client.post(url, headers=normal_user_token_headers, json=payload)
+    assert response.status_code == 201
+
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=2)
+    first, second = worklog.time_segments
+    response = client.patch(
+        f"{settings.API_V1_STR}/assessment_task/update-time-segment",
+        headers=normal_user_token_headers,
+        params={"time_segment_id": str(first.id)},
+        json={
+            "start_time": first.start_time.isoformat(),
+            "end_time": (second.start_time + timedelta(minutes=1)).isoformat(),
+            "description": None,
+            "notes": None,
+        },
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == (
+        f"The time segment overlaps the time segment {second.id}."
+    )
+
+
+def test_overlap_found_past_a_nested_stored_segment(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    task = create_random_task(db)
+    day = datetime(2025, 6, 9)
+    # stored segments overlapping each other, as older data and imports may have
+    db.add(
+        WorkLog(
+            user_id=user.id,
+            task_id=task.id,
+            total_duration_minutes=210,
+            segment_count=2,
+            time_segments=[
+                TimeSegment(
+                    user_id=user.id,
+                    start_time=day.replace(hour=9),
+                    end_time=day.replace(hour=12),
+                ),
+                TimeSegment(
+                    user_id=user.id,
+                    start_time=day.replace(hour=10),
+                    end_time=day.replace(hour=10, minute=30),
+                ),
+            ],
+        )
+    )
+    db.commit()
+
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/create-wroklog",
+        headers=normal_user_token_headers,
+        json={
+            "task_id": str(task.id),
+            "time_segments": [
+                {
+                    "start_time": day.replace(hour=11).isoformat(),
+                    "end_time": day.replace(hour=11, minute=30).isoformat(),
+                }
+            ],
+        },
+    )
+    assert response.status_code == 409
+
+
+def test_batch_update_and_delete_time_segments(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    first = create_random_worklog(db, user_id=user.id, segments=2)
+    second = create_random_worklog(db, user_id=user.id, segments=1)
+    patches = [
+        {
+            "id": str(ts.id),
+            "start_time": ts.start_time.isoformat(),
+            "end_time": (ts.start_time + timedelta(minutes=45)).isoformat(),
+            "description": "corrected",
+            "notes": None,
+        }
+        for ts in [*first.time_segments, *second.time_segments]
+    ]
+    response = client.patch(
+        f"{settings.API_V1_STR}/assessment_task/update-time-segments",
+        headers=normal_user_token_headers,
+        json={"time_segments": patches},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"count": 3}
+    db.refresh(first)
+    db.refresh(second)
+    assert first.total_duration_minutes == 90
+    assert second.total_duration_minutes == 45
+    assert {ts.description for ts in first.time_segments} == {"corrected"}
+
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/remove-time-segments",
+        headers=normal_user_token_headers,
+        json={"ids": [str(first.time_segments[0].id), str(second.time_segments[0].id)]},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"count": 2}
+    db.expire_all()
+    assert first.segment_count == 1
+    assert first.total_duration_minutes == 45
+    assert second.segment_count == 0
+    assert second.total_duration_minutes == 0
+
+
+def test_batch_update_rejects_inverted_time_segments(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=1)
+    segment = worklog.time_segments[0]
+    patch = {
+        "id": str(segment.id),
+        "start_time": segment.start_time.isoformat(),
+        "end_time": (segment.start_time - timedelta(minutes=30)).isoformat(),
+        "description": None,
+        "notes": None,
+    }
+    response = client.patch(
+        f"{settings.API_V1_STR}/assessment_task/update-time-segments",
+        headers=normal_user_token_headers,
+        json={"time_segments": [patch]},
+    )
+    assert response.status_code == 422
+    db.refresh(worklog)
+    assert worklog.total_duration_minutes == 30
+
+
+def test_batch_delete_time_segments_of_another_user(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    own = create_random_worklog(db, user_id=user.id, segments=1)
+    other = create_random_worklog(db, segments=1)
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/remove-time-segments",
+        headers=normal_user_token_headers,
+        json={"ids": [str(own.time_segments[0].id), str(other.time_segments[0].id)]},
+    )
+    assert response.status_code == 404
+    assert str(other.time_segments[0].id) in response.json()["detail"]
+    db.refresh(own)
+    assert len(own.time_segments) == 1
+
+
+def test_remitted_time_segments_cannot_be_changed(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=2)
+    paid, open_ = worklog.time_segments
+    now = datetime.now(timezone.utc)
+    remittance = Remittance(
+        user_id=user.id, total_amount=0.5, period_start=now, period_end=now
+    )
+    db.add(remittance)
+    db.flush()
+    paid.remittance_id = remittance.id
+    db.commit()
+    url = f"{settings.API_V1_STR}/assessment_task"
+    patch = {
+        "start_time": paid.start_time.isoformat(),
+        "end_time": (paid.start_time + timedelta(minutes=50)).isoformat(),
+        "description": "changed",
+        "notes": None,
+    }
+
+    response = client.patch(
+        f"{url}/update-time-segment",
+        headers=normal_user_token_headers,
+        params={"time_segment_id": str(paid.id)},
+        json=patch,
+    )
+    assert response.status_code == 409
+    response = client.delete(
+        f"{url}/remove-time-segment",
+        headers=normal_user_token_headers,
+        params={"time_segment_id": str(paid.id)},
+    )
+    assert response.status_code == 409
+    response = client.patch(
+        f"{url}/update-time-segments",
+        headers=normal_user_token_headers,
+        json={"time_segments": [{"id": str(paid.id), **patch}]},
+    )
+    assert response.status_code == 409
+    response = client.post(
+        f"{url}/remove-time-segments",
+        headers=normal_user_token_headers,
+        json={"ids": [str(open_.id), str(paid.id)]},
+    )
+    assert response.status_code == 409
+    assert str(paid.id) in response.json()["detail"]
+
+    db.refresh(worklog)
+    assert worklog.segment_count == 2
+    assert worklog.total_duration_minutes == 60
+    assert {ts.description for ts in worklog.time_segments} != {"changed"}
+
+
+def test_live_timer_is_buffered_and_flushed(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=1)
+    url = f"{settings.API_V1_STR}/assessment_task/timer"
+    body = {"worklog_id": str(worklog.id), "description": "live"}
+
+    response = client.post(f"{url}/start", headers=normal_user_token_headers, json=body)
+    assert response.status_code == 201
+    started_at = response.json()["start_time"]
+    response = client.post(f"{url}/start", headers=normal_user_token_headers, json=body)
+    assert response.status_code == 409
+    assert client.get(url, headers=normal_user_token_headers).json()["start_time"] == started_at
+
+    response = client.post(f"{url}/stop", headers=normal_user_token_headers)
+    assert response.status_code == 200
+    assert response.json()["end_time"] is not None
+    # a heartbeat restart continues the buffered segment
+    response = client.post(f"{url}/start", headers=normal_user_token_headers, json=body)
+    assert response.json()["start_time"] == started_at
+    response = client.post(f"{url}/stop", headers=normal_user_token_headers)
+    assert response.status_code == 200
+    assert client.get(url, headers=normal_user_token_headers).json() is None
+    response = client.post(f"{url}/stop", headers=normal_user_token_headers)
+    assert response.status_code == 404
+
+    # nothing is written until the buffer is flushed
+    db.refresh(worklog)
+    assert worklog.segment_count == 1
+    assert flush_timers() == 1
+    db.refresh(worklog)
+    assert worklog.segment_count == 2
+    assert [ts.description for ts in worklog.time_segments].count("live") == 1
+
+
+def test_flush_drops_timer_segment_overlapping_later_work(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    worklog = create_random_worklog(db, user_id=user.id, segments=1)
+    url = f"{settings.API_V1_STR}/assessment_task/timer"
+    response = client.post(
+        f"{url}/start", headers=normal_user_token_headers, json={"worklog_id": str(worklog.id)}
+    )
+    assert response.status_code == 201
+    response = client.post(f"{url}/stop", headers=normal_user_token_headers)
+    assert response.status_code == 200
+    stopped = response.json()
+
+    # logged before the flush; the buffered segment is not visible to it
+    response = client.post(
+        f"{settings.API_V1_STR}/assessment_task/create-wroklog",
+        headers=normal_user_token_headers,
+        json={
+            "task_id": str(create_random_task(db).id),
+            "time_segments": [
+                {
+                    "start_time": stopped["start_time"],
+                    "end_time": stopped["end_time"],
+                }
+            ],
+        },
+    )
+    assert response.status_code == 201
+    assert flush_timers() == 0
+    db.refresh(worklog)
+    assert worklog.segment_count == 1
@@ -7,7 +7,18 @@ from sqlmodel import Session, delete
 from app.core.config import settings
 from app.core.db import engine, init_db
 from app.main import app
-from app.models import Item, User
+from app.models import (
+    IdempotencyKey,
+    ImportJob,
+    Item,
+    Remittance,
+    RemittanceJob,
+    Task,
+    TimeSegment,
+    Tombstone,
+    User,
+    WorkLog,
+)
 from tests.utils.user import authentication_token_from_email
 from tests.utils.utils import get_superuser_token_headers
 
@@ -19,6 +30,22 @@ def db() -> Generator[Session, None, None]:
         yield session
         statement = delete(Item)
         session.execute(statement)
+        statement = delete(TimeSegment)
+        session.execute(statement)
+        statement = delete(WorkLog)
+        session.execute(statement)
+        statement = delete(Remittance)
+        session.execute(statement)
+        statement = delete(Task)
+        session.execute(statement)
+        statement = delete(ImportJob)
+        session.execute(statement)
+        statement = delete(RemittanceJob)
+        session.execute(statement)
+        statement = delete(IdempotencyKey)
+        session.execute(statement)
+        statement = delete(Tombstone)
+        session.execute(statement)
         statement = delete(User)
         session.execute(statement)
         session.commit()
@@ -0,0 +1,49 @@
+import itertools
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from app.models import Task, TimeSegment, WorkLog
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_lower_string
+
+# each worklog gets hours of its own further in the past, so the segments
+# of one user never overlap
+_hours_back = itertools.count(step=24)
+
+
+def create_random_task(db: Session) -> Task:
+    task = Task(title=random_lower_string(), description=random_lower_string())
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def create_random_worklog(
+    db: Session, user_id: uuid.UUID | None = None, segments: int = 2
+) -> WorkLog:
+    if user_id is None:
+        user_id = create_random_user(db).id
+    task = create_random_task(db)
+    start = datetime.now(timezone.utc) - timedelta(days=1, hours=next(_hours_back))
+    worklog = WorkLog(
+        user_id=user_id,
+        task_id=task.id,
+        total_duration_minutes=30 * segments,
+        segment_count=segments,
+        time_segments=[
+            TimeSegment(
+                user_id=user_id,
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i, minutes=30),
+                description=random_lower_string(),
+            )
+            for i in range(segments)
+        ],
+    )
+    db.add(worklog)
+    db.commit()
+    db.refresh(worklog)
+    return worklog